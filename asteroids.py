@@ -5,6 +5,9 @@ import os
 import random
 import time
 import math
+from array import array
+
+from frame_pacer import FramePacer
 
 #Import the Turtle module
 import turtle
@@ -27,46 +30,103 @@ turtle.setundobuffer(1)
 #This speeds up drawing
 turtle.tracer(0)
 
+#Missile settings
+MISSILE_CAPACITY = 128
+MISSILE_SPEED = 20
+MISSILE_FIRE_RATE = 8
+#Grid cell for missile hit tests; must be at least the largest hit distance
+MISSILE_GRID_CELL = 50
+
+
+#A ring of radius 20 around the player, registered once as a shape so the
+#shield is a single canvas item that moves with the player
+turtle.register_shape("shield", tuple(
+    (20 * math.cos(i * math.pi / 12), 20 * math.sin(i * math.pi / 12)) for i in range(24)))
+
+#Colour and outline width for each shield strength band
+SHIELD_BANDS = {
+    3: ("purple", 3),
+    2: ("yellow", 2),
+    1: ("purple", 1),
+}
+
 
 class Shield(turtle.Turtle):
     def __init__(self):
-        turtle.Turtle.__init__(self)
-        self.speed(1)
+        turtle.Turtle.__init__(self, shape="shield")
+        self.speed(0)
         self.penup()
         self.ht()
-        self.frame = 1
         self.strength = 100
-    
+        self.band = 0
+        self.position = None
+
+    def get_band(self):
+        if self.strength > 66:
+            return 3
+        elif self.strength > 33:
+            return 2
+        elif self.strength > 0:
+            return 1
+        return 0
+
     def draw(self):
-        shield.goto(player.xcor() + 20, player.ycor())
-        shield.setheading(90)
-        shield.pendown()
-        if shield.strength > 66:
-            shield.color("purple")
-            shield.pensize(3)
-        elif shield.strength > 33 and shield.strength <= 66:
-            shield.color("yellow")
-            shield.pensize(2)
-        elif shield.strength > 0 and shield.strength <= 33:
-            shield.color("purple")
-            shield.pensize(1)
-        else:
-            shield.color("purple")
-            shield.strength = 0
+        if self.strength <= 0:
+            self.strength = 0
+
+        #Only touch the canvas when the band or the player position changes
+        band = self.get_band()
+        if band != self.band:
+            self.band = band
+            if band == 0:
+                self.ht()
+            else:
+                color, width = SHIELD_BANDS[band]
+                self.color(color, "")
+                self.shapesize(outline=width)
+                self.st()
 
-        if self.strength > 0:
-            shield.circle(20)
-            shield.penup()
-            shield.frame += 1
-        else:
-            shield.clear()
-        
-        if shield.frame == 3:
-            shield.clear()
-            shield.frame = 1
+        position = (player.xcor(), player.ycor())
+        if band > 0 and position != self.position:
+            self.position = position
+            self.goto(position)
 
 
-    
+class Hud():
+    #Status line above the board. Text is only rewritten when one of the
+    #values changes, so idle frames cost no Tk calls.
+    def __init__(self):
+        self.pen = turtle.Turtle()
+        self.pen.speed(0)
+        self.pen.color("white")
+        self.pen.penup()
+        self.pen.ht()
+        self.pen.goto(-300, 310)
+        self.values = None
+
+    def show(self, level, score, lives, shields):
+        values = (level, score, lives, shields)
+        if values == self.values:
+            return
+        self.values = values
+        msg = "ASTEROIDS! Level: {}  Score: {}  Lives: {}  Shields: {}".format(*values)
+        self.pen.clear()
+        self.pen.write(msg, font=("Arial", 16, "normal"))
+
+
+def collision_distance(size):
+    #Distance changes based on shield strength
+    if shield.strength > 0:
+        if size == 3.0:
+            return 45
+        elif size == 2.0:
+            return 35
+        return 25
+    else:
+        if size == 3.0:
+            return 30
+        return 25
+
 
 class Sprite(turtle.Turtle):
     def __init__(self, spriteshape, color, startx, starty):
@@ -95,22 +155,7 @@ class Sprite(turtle.Turtle):
             self.sety(self.ycor() + 580)
             
     def is_collision(self, other):
-        #Distance changes based on shield strength
-        if shield.strength > 0:
-            if other.size == 3.0:
-                distance = 45
-            elif other.size == 2.0:
-                distance = 35
-            elif other.size == 1.0:
-                distance = 25
-        else:
-            if other.size == 3.0:
-                distance = 30
-            elif other.size == 2.0:
-                distance = 25
-            elif other.size == 1.0:
-                distance = 25
-            
+        distance = collision_distance(other.size)
 
         if (self.xcor() >= (other.xcor() - distance)) and \
         (self.xcor() <= (other.xcor() + distance)) and \
@@ -190,16 +235,8 @@ class Player(Sprite):
             
             #Check if player is out of lives. If so, reset.
             if game.lives < 1:
-                #Reset game
-                for asteroid in asteroids:
-                    asteroid.size = 1
-                    asteroid.goto(-1000, -1000)
-
-                for asteroid in asteroids:                    
-                    asteroid.destroy()
-                #Clear the asteroid list                    
-                #Python 3.3 and above                
-                asteroids.clear()
+                #Reset game: every asteroid goes back to the pool
+                asteroid_pool.release_all()
 
                 game.level = 1
                 game.lives = 3
@@ -207,8 +244,8 @@ class Player(Sprite):
                 shield.strength = 100
                 player.goto(0, 0)
                 game.start_level()
-
-            asteroid.destroy()
+            else:
+                asteroid.destroy()
         
         game.show_status()
 
@@ -256,15 +293,24 @@ class Asteroid(Sprite):
         if self.ycor() < bottom:
             self.sety(self.ycor() + top * 2)
 
+    def respawn(self, size, speed, startx, starty):
+        #Reuse this sprite for a fresh asteroid
+        self.size = size
+        self.speed = speed
+        self.shapesize(stretch_wid=size, stretch_len=size, outline=None)
+        self.goto(startx, starty)
+        self.setheading(random.randint(0, 360))
+        self.st()
+
     def destroy(self):
             if self.size == 3.0:
                 self.size = 2.0
                 self.speed = 5
-                #Append a new asteroid
-                asteroids.append(Asteroid("circle", "brown",2.0 ,4 , self.xcor(), self.ycor()))
+                #Take a second asteroid from the pool
+                asteroid_pool.spawn(2.0, 4, self.xcor(), self.ycor())
 
                 #Change Asteroid Size            
-                self.shapesize(stretch_wid=asteroid.size, stretch_len=asteroid.size, outline=None)
+                self.shapesize(stretch_wid=self.size, stretch_len=self.size, outline=None)
                 #Change Heading
                 self.setheading(random.randint(0, 360))
 
@@ -272,51 +318,154 @@ class Asteroid(Sprite):
             elif self.size == 2.0:
                 self.size = 1.0
                 self.speed = 7
-                #Append a new asteroid
-                asteroids.append(Asteroid("circle", "brown",1.0 ,5 , self.xcor(), self.ycor()))
+                #Take a second asteroid from the pool
+                asteroid_pool.spawn(1.0, 5, self.xcor(), self.ycor())
 
                 #Change Asteroid Size            
-                self.shapesize(stretch_wid=asteroid.size, stretch_len=asteroid.size, outline=None)
+                self.shapesize(stretch_wid=self.size, stretch_len=self.size, outline=None)
                 #Change Heading
                 self.setheading(random.randint(0, 360))
 
-            elif self.size == 0.5:
-                self.goto(1000, 1000)
-                self.ht()
-                if asteroid in asteroids:
-                    asteroids.remove(asteroid)
-
-
+            else:
+                #Smallest size: hand the sprite back to the pool
+                asteroid_pool.release(self)
+
+
+class AsteroidPool():
+    #A fixed set of asteroid sprites that get reused instead of creating
+    #new turtles. Turtles are never removed from the screen, so making new
+    #ones on every split keeps adding canvas items and slows turtle.update().
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.free = []
+        for i in range(capacity):
+            asteroid = Asteroid("circle", "brown", 1.0, 0, -1000, -1000)
+            asteroid.ht()
+            self.free.append(asteroid)
+
+    def spawn(self, size, speed, startx, starty):
+        #Returns None when every sprite is already in play
+        if not self.free:
+            return None
+        asteroid = self.free.pop()
+        asteroid.respawn(size, speed, startx, starty)
+        asteroids.append(asteroid)
+        return asteroid
+
+    def release(self, asteroid):
+        if asteroid in asteroids:
+            asteroids.remove(asteroid)
+            asteroid.ht()
+            asteroid.goto(-1000, -1000)
+            self.free.append(asteroid)
+
+    def release_all(self):
+        for asteroid in asteroids[:]:
+            self.release(asteroid)
 
     
 class Missile(Sprite):
+    #Only draws a missile; the pool owns its position and velocity
     def __init__(self, spriteshape, color, startx, starty):
         Sprite.__init__(self, spriteshape, color, startx, starty)
         self.shapesize(stretch_wid=0.2, stretch_len=0.4, outline=None)
-        self.speed = 0.1
-        self.status = "ready"
+        self.ht()
         self.goto(-1000, 1000)
-        
+
+
+class MissilePool():
+    #Many missiles in flight at once. Positions and velocities are kept in
+    #flat arrays so moving and hit-testing a missile is a few float ops;
+    #the turtles are only used for drawing.
+    def __init__(self, capacity, speed, fire_rate):
+        self.capacity = capacity
+        self.speed = speed
+        #Shots per second while space is held down
+        self.fire_delay = 1.0 / fire_rate
+        self.last_fire = 0.0
+        self.x = array("d", [0.0] * capacity)
+        self.y = array("d", [0.0] * capacity)
+        self.dx = array("d", [0.0] * capacity)
+        self.dy = array("d", [0.0] * capacity)
+        self.sprites = [Missile("triangle", "yellow", 0, 0) for i in range(capacity)]
+        self.free = list(range(capacity))
+        self.active = []
+
     def fire(self):
-        if self.status == "ready":
-            #Play missile sound
-            #os.system("afplay laser.mp3&")
-            self.goto(player.xcor(), player.ycor())
-            self.setheading(player.heading())
-            self.status = "firing"
-            
+        now = time.perf_counter()
+        if now - self.last_fire < self.fire_delay or not self.free:
+            return
+        self.last_fire = now
+        #Play missile sound
+        #os.system("afplay laser.mp3&")
+        i = self.free.pop()
+        h = player.heading() * math.pi / 180
+        self.x[i] = player.xcor()
+        self.y[i] = player.ycor()
+        self.dx[i] = math.cos(h) * self.speed
+        self.dy[i] = math.sin(h) * self.speed
+        self.active.append(i)
+        sprite = self.sprites[i]
+        sprite.setheading(player.heading())
+        sprite.goto(self.x[i], self.y[i])
+        sprite.st()
+
+    def release(self, i):
+        self.active.remove(i)
+        self.free.append(i)
+        self.sprites[i].ht()
+        self.sprites[i].goto(-1000, 1000)
+
     def move(self):
-        if self.status == "ready":
-            self.goto(-1000, 1000)
-        
-        elif self.status == "firing":
-            self.fd(self.speed)    
-            
-        #Border check
-        if self.xcor() < -290 or self.xcor() > 290 or \
-            self.ycor()< -290 or self.ycor()> 290:
-            self.goto(-1000,1000)
-            self.status = "ready"
+        x, y, dx, dy = self.x, self.y, self.dx, self.dy
+        for i in self.active[:]:
+            x[i] += dx[i]
+            y[i] += dy[i]
+            #Border check
+            if x[i] < -290 or x[i] > 290 or y[i] < -290 or y[i] > 290:
+                self.release(i)
+            else:
+                self.sprites[i].goto(x[i], y[i])
+
+    def check_hits(self, targets):
+        #Returns (missile, asteroid) pairs, at most one missile per asteroid.
+        #Missiles are bucketed into a coarse grid once per frame, so each
+        #asteroid only looks at the missiles in the 9 cells around it.
+        if not self.active:
+            return []
+        cell = MISSILE_GRID_CELL
+        x, y = self.x, self.y
+        buckets = {}
+        for i in self.active:
+            key = (int(x[i] // cell), int(y[i] // cell))
+            buckets.setdefault(key, []).append(i)
+
+        hits = []
+        used = set()
+        for asteroid in targets:
+            ax = asteroid.xcor()
+            ay = asteroid.ycor()
+            distance = collision_distance(asteroid.size)
+            cx = int(ax // cell)
+            cy = int(ay // cell)
+            found = None
+            for gx in (cx - 1, cx, cx + 1):
+                for gy in (cy - 1, cy, cy + 1):
+                    for i in buckets.get((gx, gy), ()):
+                        if i in used:
+                            continue
+                        if abs(x[i] - ax) <= distance and abs(y[i] - ay) <= distance:
+                            found = i
+                            break
+                    if found is not None:
+                        break
+                if found is not None:
+                    break
+            if found is not None:
+                used.add(found)
+                hits.append((found, asteroid))
+        return hits
+
 
 class Particle(Sprite):
     def __init__(self, spriteshape, color, startx, starty):
@@ -353,7 +502,7 @@ class Game():
         
     def start_level(self):
         for i in range(self.level):
-            asteroids.append(Asteroid("squere", "brown", 3.0, 2, random.randint(-300, 300), random.randint(-300, 300)))
+            asteroid_pool.spawn(3.0, 2, random.randint(-300, 300), random.randint(-300, 300))
 
     def draw_border(self):
         #Draw border
@@ -371,18 +520,15 @@ class Game():
         self.pen.pendown()
         
     def show_status(self):
-        self.pen.undo()
-        msg = "ASTEROIDS! Level: {}  Score: {}  Lives: {}  Shields: {}".format(self.level, self.score, game.lives, shield.strength)
-        self.pen.penup()
-        self.pen.goto(-300, 310)
-        self.pen.write(msg, font=("Arial", 16, "normal"))
+        hud.show(self.level, self.score, self.lives, shield.strength)
 
     
 
 #Create my sprites
 player = Player("triangle", "white", 0, 0)
-missile = Missile("triangle", "yellow", 0, 0)
+missiles = MissilePool(MISSILE_CAPACITY, MISSILE_SPEED, MISSILE_FIRE_RATE)
 shield = Shield()
+hud = Hud()
 
 #Create game object
 game = Game()
@@ -395,6 +541,9 @@ game.show_status()
 
 asteroids =[]
 
+#Every asteroid sprite the game will ever use
+asteroid_pool = AsteroidPool(64)
+
 #Start the level
 game.start_level()
 
@@ -407,60 +556,71 @@ turtle.onkeypress(player.turn_left, "Left")
 turtle.onkeypress(player.turn_right, "Right")
 turtle.onkeypress(player.accelerate, "Up")
 turtle.onkeypress(player.hyperspace, "Down")
-turtle.onkeypress(missile.fire, "space")
+turtle.onkeypress(missiles.fire, "space")
 turtle.listen()
 
 #Main game loop
-while True:
-    turtle.update()
-    time.sleep(0.02)
-
-    player.move()
-    missile.move()
-    
-    for asteroid in asteroids:
-        asteroid.move()
+#The pacer keeps each frame at 20 ms however much work it took
+pacer = FramePacer(0.02)
+try:
+    while True:
+        turtle.update()
+
+        player.move()
+        missiles.move()
         
-        #Check for a collision with the player
-        if player.is_collision(asteroid):
-            #Play explosion sound
-            #os.system("afplay explosion.mp3&")
-            #Do the explosion
-
-            player.collides(asteroid)
+        #Loop over a copy: splitting and destroying change the list
+        for asteroid in asteroids[:]:
+            if asteroid not in asteroids:
+                continue
+            asteroid.move()
             
-        #Check for a collision between the missile and the asteroid
-        if missile.is_collision(asteroid):
+            #Check for a collision with the player
+            if player.is_collision(asteroid):
+                #Play explosion sound
+                #os.system("afplay explosion.mp3&")
+                #Do the explosion
+
+                player.collides(asteroid)
+
+        #Check all missiles against all asteroids in one pass
+        for i, asteroid in missiles.check_hits(asteroids):
+            if asteroid not in asteroids:
+                continue
             #Play explosion sound
             #os.system("afplay explosion.mp3&")
 
-
-            #Reset the Missile Status    
-            missile.status = "ready"
-
             #Increase the score
             game.score += 100
             game.show_status()
             #Do the explosion
             for particle in particles:
-                x = (asteroid.xcor() + missile.xcor()) / 2.0
-                y = (asteroid.ycor() + missile.ycor()) / 2.0
+                x = (asteroid.xcor() + missiles.x[i]) / 2.0
+                y = (asteroid.ycor() + missiles.y[i]) / 2.0
                 particle.explode(x, y)
 
+            #The missile is used up
+            missiles.release(i)
+
             #If the asteroid is Large, make it small times 2
             asteroid.destroy()
 
-    for particle in particles:
-        particle.move()
+        for particle in particles:
+            particle.move()
 
-    #Shield
-    shield.draw()
+        #Shield
+        shield.draw()
 
-    #Check for end of level
-    if len(asteroids) == 0:
-        game.level += 1
-        game.start_level()
+        #Check for end of level
+        if len(asteroids) == 0:
+            game.level += 1
+            game.start_level()
+
+        game.show_status()
 
-    game.show_status()
+        pacer.tick()
+except turtle.Terminator:
+    #Window closed
+    print("Frame pacing:", pacer.summary())
 
 delay = input("Press enter to finish. > ")
\ No newline at end of file
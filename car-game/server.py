@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+"""Static file server for the car game.
+
+A drop-in for `python3 -m http.server` that copes with many players on
+the LAN and with repeated reloads:
+
+- requests are handled by a fixed pool of threads; kept-alive connections
+  only take a thread while a request is being answered
+- `.js`, `.css`, `.html`, `.json`, `.svg` and `.webmanifest` files get a
+  gzip copy next to them (`script.js.gz`, ...) made once at startup, and
+  that copy is sent to browsers that accept gzip
+- every response has an ETag, so a reload with If-None-Match gets a bare
+  304 instead of the file again
+- Range requests (one range) are answered with 206 Partial Content
+- files with a content hash in their name (`script.3f2a9c1d.js`) are
+  cached for a year; everything else must be revalidated, so a new
+  `sw.js` or `index.html` is picked up on the next load
+
+Usage:
+    python3 server.py [port] [--bind ADDRESS] [--threads N] [--directory DIR]
+"""
+import argparse
+import gzip
+import os
+import re
+import selectors
+import shutil
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from http.server import HTTPServer, SimpleHTTPRequestHandler
+
+COMPRESSIBLE = ('.js', '.css', '.html', '.json', '.svg', '.webmanifest')
+# Not worth a gzip copy below this size
+MIN_GZIP_SIZE = 256
+# `name.<8+ hex digits>.ext`: the name changes whenever the content does
+HASHED_NAME = re.compile(r'\.[0-9a-f]{8,}\.[A-Za-z0-9]+$')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+# Kept-alive connections with no request for this long are closed
+IDLE_TIMEOUT = 15
+
+
+def precompress(root, level=9):
+    """Write `file.gz` next to each compressible file that has none or an
+    older one. Returns the paths written."""
+    written = []
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if not name.endswith(COMPRESSIBLE):
+                continue
+            path = os.path.join(dirpath, name)
+            st = os.stat(path)
+            if st.st_size < MIN_GZIP_SIZE:
+                continue
+            gz_path = path + '.gz'
+            try:
+                if os.stat(gz_path).st_mtime_ns >= st.st_mtime_ns:
+                    continue
+            except FileNotFoundError:
+                pass
+            with open(path, 'rb') as src, open(gz_path + '.tmp', 'wb') as raw:
+                # mtime=0 keeps the .gz identical across runs
+                with gzip.GzipFile(filename='', mode='wb', fileobj=raw, compresslevel=level, mtime=0) as dst:
+                    shutil.copyfileobj(src, dst)
+            os.replace(gz_path + '.tmp', gz_path)
+            written.append(gz_path)
+    return written
+
+
+def make_etag(st, encoding=''):
+    tag = '{:x}-{:x}'.format(st.st_size, st.st_mtime_ns)
+    if encoding:
+        tag += '-' + encoding
+    return '"{}"'.format(tag)
+
+
+def cache_control(path):
+    return IMMUTABLE if HASHED_NAME.search(os.path.basename(path)) else REVALIDATE
+
+
+def parse_range(header, size):
+    """(start, end) inclusive for a single `bytes=` range, None to ignore the
+    header, or ValueError if the range cannot be satisfied."""
+    match = RANGE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        # Several ranges or another unit: send the whole file
+        return None
+    first, last = match.groups()
+    if first and last and int(last) < int(first):
+        # Not a valid range at all: ignored, like a header we don't know
+        return None
+    if size == 0:
+        # No byte of an empty file can be asked for
+        raise ValueError('range of an empty file')
+    if not first:
+        # The last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError('empty suffix range')
+        return max(0, size - length), size - 1
+    start = int(first)
+    if start >= size:
+        raise ValueError('range outside the file')
+    end = min(int(last), size - 1) if last else size - 1
+    return start, end
+
+
+def etag_matches(header, etag):
+    if header.strip() == '*':
+        return True
+    # A weak comparison, as If-None-Match asks for
+    tags = [t.strip() for t in header.split(',')]
+    return any(t[2:] == etag if t.startswith('W/') else t == etag for t in tags)
+
+
+class CarGameHandler(SimpleHTTPRequestHandler):
+    """Answers one request per call; the server keeps the connection."""
+
+    protocol_version = 'HTTP/1.1'
+    # A client that stalls half way through a request gives its thread
+    # back after this long
+    timeout = 5
+
+    extensions_map = dict(SimpleHTTPRequestHandler.extensions_map, **{
+        '.js': 'text/javascript',
+        '.webmanifest': 'application/manifest+json',
+    })
+
+    def setup(self):
+        super().setup()
+        # The connection's own reader, kept between requests: it may
+        # already hold the start of the next one
+        self.rfile.close()
+        self.rfile = self.server.reader(self.connection)
+
+    def handle(self):
+        # Between requests the connection waits in the server's selector,
+        # not on one of the pool's threads
+        self.close_connection = True
+        self.handle_one_request()
+
+    def finish(self):
+        # Like StreamRequestHandler.finish, but rfile outlives the request
+        if not self.wfile.closed:
+            try:
+                self.wfile.flush()
+            except OSError:
+                pass
+        self.wfile.close()
+
+    def do_GET(self):
+        f, start, length = self.send_head()
+        if f is None:
+            return
+        try:
+            f.seek(start)
+            self.copy_bytes(f, length)
+        finally:
+            f.close()
+
+    def do_HEAD(self):
+        f, _, _ = self.send_head()
+        if f is not None:
+            f.close()
+
+    def copy_bytes(self, f, length, chunk=64 * 1024):
+        while length > 0:
+            data = f.read(min(chunk, length))
+            if not data:
+                break
+            self.wfile.write(data)
+            length -= len(data)
+
+    def send_head(self):
+        """Send the headers; returns (file, offset, byte count) or a None file."""
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            if not self.path.split('?', 1)[0].endswith('/'):
+                self.send_response(HTTPStatus.MOVED_PERMANENTLY)
+                parts = self.path.split('?', 1)
+                parts[0] += '/'
+                self.send_header('Location', '?'.join(parts))
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return None, 0, 0
+            path = os.path.join(path, 'index.html')
+        if path.endswith('/') or not os.path.isfile(path):
+            self.send_error(HTTPStatus.NOT_FOUND, 'File not found')
+            return None, 0, 0
+
+        ctype = self.guess_type(path)
+        range_header = self.headers.get('Range')
+        encoding = ''
+        send_path = path
+        # Ranges are served from the plain file so the offsets mean the same
+        # thing to every client
+        if path.endswith(COMPRESSIBLE) and range_header is None and self.accepts_gzip():
+            try:
+                if os.stat(path + '.gz').st_mtime_ns >= os.stat(path).st_mtime_ns:
+                    send_path, encoding = path + '.gz', 'gzip'
+            except FileNotFoundError:
+                pass
+        try:
+            f = open(send_path, 'rb')
+        except OSError:
+            self.send_error(HTTPStatus.NOT_FOUND, 'File not found')
+            return None, 0, 0
+
+        try:
+            st = os.fstat(f.fileno())
+            # The tag of the source file, so it changes when the file does
+            etag = make_etag(os.stat(path) if encoding else st, encoding)
+            size = st.st_size
+
+            inm = self.headers.get('If-None-Match')
+            if inm is not None and etag_matches(inm, etag):
+                self.send_response(HTTPStatus.NOT_MODIFIED)
+                self.send_common_headers(path, etag, encoding)
+                self.end_headers()
+                f.close()
+                return None, 0, 0
+
+            start, length = 0, size
+            status = HTTPStatus.OK
+            if range_header is not None and self.if_range_holds(etag):
+                try:
+                    span = parse_range(range_header, size)
+                except ValueError:
+                    self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                    self.send_header('Content-Range', 'bytes */{}'.format(size))
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    f.close()
+                    return None, 0, 0
+                if span is not None:
+                    start, end = span
+                    length = end - start + 1
+                    status = HTTPStatus.PARTIAL_CONTENT
+
+            self.send_response(status)
+            self.send_header('Content-Type', ctype)
+            self.send_header('Content-Length', str(length))
+            if status == HTTPStatus.PARTIAL_CONTENT:
+                self.send_header('Content-Range', 'bytes {}-{}/{}'.format(start, start + length - 1, size))
+            if encoding:
+                self.send_header('Content-Encoding', encoding)
+            self.send_common_headers(path, etag, encoding)
+            self.send_header('Last-Modified', self.date_time_string(os.stat(path).st_mtime))
+            self.end_headers()
+            return f, start, length
+        except Exception:
+            f.close()
+            raise
+
+    def send_common_headers(self, path, etag, encoding):
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', cache_control(path))
+        self.send_header('Accept-Ranges', 'bytes')
+        if path.endswith(COMPRESSIBLE):
+            self.send_header('Vary', 'Accept-Encoding')
+
+    def accepts_gzip(self):
+        for part in self.headers.get('Accept-Encoding', '').split(','):
+            name, _, params = part.partition(';')
+            if name.strip().lower() != 'gzip':
+                continue
+            q = params.strip()
+            try:
+                return not q.startswith('q=') or float(q[2:]) > 0
+            except ValueError:
+                return True
+        return False
+
+    def if_range_holds(self, etag):
+        """A Range only applies if If-Range, when sent, still matches."""
+        if_range = self.headers.get('If-Range')
+        # A date cannot tell two versions in the same second apart: for
+        # those the whole file is sent, which is always correct
+        return if_range is None or if_range.strip() == etag
+
+
+class PooledHTTPServer(HTTPServer):
+    """HTTPServer that answers requests on a fixed pool of threads.
+
+    A thread is only taken while a request is read and answered. Between
+    requests a kept-alive connection is parked in a selector watched by
+    one thread, so idle browsers never keep other players waiting; it is
+    closed after `idle_timeout` seconds without a request.
+    """
+
+    def __init__(self, address, handler, threads=32, idle_timeout=IDLE_TIMEOUT):
+        # Listen on IPv6 (and IPv4, where the OS maps it) for a '::' address
+        if ':' in address[0]:
+            self.address_family = socket.AF_INET6
+        super().__init__(address, handler)
+        self.idle_timeout = idle_timeout
+        self.pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='car-game')
+        self.closing = False
+        self._lock = threading.Lock()
+        self._readers = {}      # every open connection -> its buffered reader
+        self._parked = []       # (connection, address) done with a request, for the watcher
+        self._idle = {}         # connection -> when it was parked (watcher thread only)
+        self._selector = selectors.DefaultSelector()
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._selector.register(self._wake_r, selectors.EVENT_READ)
+        self._watcher = threading.Thread(target=self._watch, name='car-game-idle', daemon=True)
+        self._watcher.start()
+
+    def reader(self, connection):
+        return self._readers[connection]
+
+    def process_request(self, request, client_address):
+        with self._lock:
+            self._readers[request] = request.makefile('rb')
+        self._submit(request, client_address)
+
+    def _submit(self, request, client_address):
+        try:
+            self.pool.submit(self._handle, request, client_address)
+        except RuntimeError:
+            # The pool has been shut down
+            self._close(request)
+
+    def _handle(self, request, client_address):
+        try:
+            keep = not self.RequestHandlerClass(request, client_address, self).close_connection
+        except Exception:
+            # Cut off by server_close: not worth a traceback
+            if not self.closing:
+                self.handle_error(request, client_address)
+            keep = False
+        if not keep or self.closing:
+            self._close(request)
+        elif self._buffered(request):
+            # The next request has already been read in (pipelining)
+            self._submit(request, client_address)
+        else:
+            with self._lock:
+                self._parked.append((request, client_address))
+            self._wake()
+
+    def _buffered(self, request):
+        request.setblocking(False)
+        try:
+            return bool(self._readers[request].peek(1))
+        except OSError:
+            return False
+        finally:
+            request.settimeout(self.RequestHandlerClass.timeout)
+
+    def _wake(self):
+        try:
+            self._wake_w.send(b'\0')
+        except OSError:
+            pass
+
+    def _watch(self):
+        while not self.closing:
+            for key, _ in self._selector.select(timeout=1.0):
+                if key.fileobj is self._wake_r:
+                    self._wake_r.recv(4096)
+                    continue
+                # A parked connection has a new request (or was closed)
+                self._selector.unregister(key.fileobj)
+                del self._idle[key.fileobj]
+                self._submit(key.fileobj, key.data)
+            now = time.monotonic()
+            with self._lock:
+                parked, self._parked = self._parked, []
+            for request, client_address in parked:
+                self._idle[request] = now
+                self._selector.register(request, selectors.EVENT_READ, client_address)
+            for request, since in list(self._idle.items()):
+                if now - since > self.idle_timeout:
+                    self._selector.unregister(request)
+                    del self._idle[request]
+                    self._close(request)
+
+    def _close(self, request):
+        with self._lock:
+            reader = self._readers.pop(request, None)
+        if reader is not None:
+            reader.close()
+            self.shutdown_request(request)
+
+    def server_close(self):
+        self.closing = True
+        super().server_close()
+        self._wake()
+        self._watcher.join()
+        with self._lock:
+            open_connections = list(self._readers)
+        # Wakes any thread still reading a request, so none is left waiting
+        for request in open_connections:
+            try:
+                request.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self.pool.shutdown(wait=True, cancel_futures=True)
+        # Whatever was parked or never got a thread
+        for request in open_connections:
+            self._close(request)
+        self._selector.close()
+        self._wake_r.close()
+        self._wake_w.close()
+
+
+def make_server(directory, port=8000, bind='', threads=32, compress=True):
+    """A ready-to-serve server for `directory`; with `compress`, gzip copies
+    are made first."""
+    directory = os.path.abspath(directory)
+    if compress:
+        precompress(directory)
+
+    class Handler(CarGameHandler):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, directory=directory, **kwargs)
+
+    return PooledHTTPServer((bind, port), Handler, threads)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the car game')
+    parser.add_argument('port', nargs='?', type=int, default=8000)
+    parser.add_argument('--bind', default='', help='address to listen on (default: all)')
+    parser.add_argument('--threads', type=int, default=32, help='worker threads (default: 32)')
+    parser.add_argument('--directory', default=os.path.dirname(os.path.abspath(__file__)))
+    args = parser.parse_args()
+
+    try:
+        precompress(args.directory)
+    except OSError as exc:
+        # A read-only directory still serves, just without gzip copies
+        print('Cannot write gzip copies in {}: {}; serving files uncompressed'.format(args.directory, exc),
+              file=sys.stderr)
+    try:
+        server = make_server(args.directory, args.port, args.bind, args.threads, compress=False)
+    except OSError as exc:
+        sys.exit('Cannot listen on port {}: {}'.format(args.port, exc))
+    host = args.bind or 'localhost'
+    print('Serving {} on http://{}:{}/ ({} threads)'.format(args.directory, host, args.port, args.threads))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print('\nStopped.')
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
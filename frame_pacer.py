@@ -0,0 +1,63 @@
+"""Frame pacing for the turtle games.
+
+A fixed ``time.sleep(delay)`` at the end of every loop ignores how long the
+update and drawing took, so the real frame time is ``delay + work`` and the
+game slows down as more things appear on screen. ``FramePacer`` measures the
+work instead and only sleeps for what is left of the frame.
+
+Usage:
+    pacer = FramePacer(0.02)
+    while True:
+        update_and_draw()
+        pacer.tick()
+"""
+import time
+
+
+class FramePacer:
+    def __init__(self, interval, clock=time.perf_counter, sleep=time.sleep):
+        self.interval = interval
+        self.clock = clock
+        self.sleep = sleep
+        self.deadline = None
+        self.frames = 0
+        self.overruns = 0
+        self.worst_overrun = 0.0
+
+    def set_interval(self, interval):
+        # Takes effect from the next frame
+        self.interval = interval
+
+    def reset(self):
+        # Call after a deliberate pause (game over screen, etc.) so the
+        # pause is not counted as an overrun.
+        self.deadline = None
+
+    def tick(self):
+        """Wait for the end of the current frame.
+
+        Returns how many seconds the frame ran over its budget (0.0 when
+        it finished in time).
+        """
+        now = self.clock()
+        self.frames += 1
+        if self.deadline is None:
+            self.deadline = now + self.interval
+            return 0.0
+
+        late = now - self.deadline
+        if late <= 0:
+            self.sleep(-late)
+            self.deadline += self.interval
+            return 0.0
+
+        # Too slow: don't try to catch up with a burst of short frames,
+        # just start the next frame from now.
+        self.overruns += 1
+        self.worst_overrun = max(self.worst_overrun, late)
+        self.deadline = now + self.interval
+        return late
+
+    def summary(self):
+        return "{} frames, {} over budget (worst {:.1f} ms over {:.1f} ms)".format(
+            self.frames, self.overruns, self.worst_overrun * 1000, self.interval * 1000)
@@ -12,218 +12,401 @@ Controls:
 - Play: start playback
 - Stop: stop playback
 - Tempo slider: adjust tempo (BPM) while playing
+- Position slider: drag to jump anywhere in the song
+- Loop 4 bars: repeat the four bars starting at the current bar
 - Save MIDI: write `stonini.mid` to disk
+- Save WAV: render the arrangement to `stonini.wav` (no playback)
+- Open MIDI...: play any .mid file instead (cancel to go back); it plays
+  at its own tempo and starts before the whole file has been read
+- Save timing CSV: write when each event of the last play was due and
+  when it went out to `timing_<engine>.csv`; mean/p99/max jitter is shown
+  in the status line while playing
+- Engine: `mixer` plays notes on free pygame channels; `stream` mixes all
+  voices itself so every event lands on its exact sample; `midi` sends
+  timestamped notes to the default MIDI output device; `async` is `mixer`
+  timed by an asyncio scheduler instead of a sleeping thread
 """
+import asyncio
+import multiprocessing
+import os
 import threading
 import time
 import tkinter as tk
-from tkinter import ttk, messagebox
+from concurrent.futures import ProcessPoolExecutor
+from tkinter import ttk, messagebox, filedialog
 from typing import List
 
 import pygame
 import pygame.midi
 
+from midi_async import AsyncPlayer
+from midi_bounce import bounce_in_worker
+from midi_bridge import PlaybackBridge
+from midi_events import EventStore
+from midi_import import DEFAULT_BPM, MidiFileTimeline
+from midi_jitter import JitterLog
+from midi_mixer import AudioStream, Performer, StreamMixer
+from midi_output import MidiScheduler
+from midi_synth import SAMPLE_RATE, Synth, quantize_duration
+from midi_timeline import TempoMap, Transport, VoiceTable, build_timeline, perc_kind, timbre_for
+from note_cache import NoteCache
 from create_and_play_midi import build_bass_pattern, write_midi, build_arrangement, write_full_midi
 
+# How often the player's position, level and jitter reach the window
+UPDATE_RATE_HZ = 20
+
+
+class ChannelPerformer:
+    """Plays timeline events as pygame Sounds on free mixer channels.
+
+    Sounds are made when a note first plays, for its length at the tempo
+    of that moment, so tempo changes never leave notes too short or too
+    long and never need a full re-synthesis. `prewarmed` holds samples
+    already made, as returned by ``MidiPlayerThread._prewarm``.
+    """
+
+    def __init__(self, synth, tempo_map, prewarmed=None):
+        self.synth = synth
+        self.tempo_map = tempo_map
+        self.sounds = {}
+        for (note, length, timbre), samples in (prewarmed or {}).items():
+            self.sounds[(note, timbre, length)] = pygame.mixer.Sound(buffer=samples)
+        self.perc_sounds = {kind: pygame.mixer.Sound(buffer=synth.perc(kind)) for kind in ('kick', 'snare', 'hat')}
+        self.channels = [pygame.mixer.Channel(i) for i in range(pygame.mixer.get_num_channels())]
+        self.voices = VoiceTable()
+
+    def busy(self):
+        """Share of mixer channels playing."""
+        return sum(1 for ch in self.channels if ch.get_busy()) / float(len(self.channels) or 1)
+
+    def note_sound(self, note, duration_beats, beat, timbre):
+        length = quantize_duration(duration_beats * 60.0 / self.tempo_map.bpm_at(beat))
+        key = (note, timbre, length)
+        if key not in self.sounds:
+            self.sounds[key] = pygame.mixer.Sound(buffer=self.synth.note(note, length, timbre=timbre))
+        return self.sounds[key]
+
+    def vocal_sound(self, syl, beat):
+        length = quantize_duration(60.0 / self.tempo_map.bpm_at(beat))
+        key = (syl, 'vocal', length)
+        if key not in self.sounds:
+            self.sounds[key] = pygame.mixer.Sound(buffer=self.synth.vocal(syl, length, volume=0.7))
+        return self.sounds[key]
+
+    @staticmethod
+    def stop_channel(ch):
+        try:
+            ch.stop()
+        except Exception:
+            pass
+
+    def _start(self, event, note, ch):
+        previous = self.voices.start(event, note, ch)
+        if previous is not None:
+            self.stop_channel(previous)
+
+    def _stop(self, event, note):
+        ch = self.voices.stop(event, note)
+        if ch is not None:
+            self.stop_channel(ch)
+
+    def handle(self, kind, beat, payload):
+        if kind == 'all_off':
+            # Seek, pause or loop wrap: nothing may keep sounding
+            for ch in self.voices.clear():
+                self.stop_channel(ch)
+        elif kind == 'note_on':
+            e = payload
+            sound = self.note_sound(e['note'], e['duration_beats'], beat, timbre_for(e['note']))
+            self._start(e, e['note'], sound.play())
+        elif kind == 'note_off':
+            self._stop(payload, payload['note'])
+        elif kind == 'chord_on':
+            e = payload
+            for n in e['chord']:
+                self._start(e, n, self.note_sound(n, e['duration_beats'], beat, 'lead').play())
+        elif kind == 'chord_off':
+            for n in payload['chord']:
+                self._stop(payload, n)
+        elif kind == 'perc_on':
+            self.perc_sounds[perc_kind(payload['note'])].play()
+        elif kind == 'vocal':
+            self.vocal_sound(payload, beat).play()
+
 
 class MidiPlayerThread(threading.Thread):
-    def __init__(self, events: List[dict], lyrics: List[tuple], tempo_getter, stop_event: threading.Event):
+    """Plays an arrangement in the background.
+
+    backend='mixer' plays each note with Sound.play() on a free pygame
+    mixer channel, timed by sleeping. backend='stream' mixes every voice
+    itself (midi_mixer) and places each event on its exact sample, with
+    at most `polyphony` voices sounding at once. backend='midi' sends the
+    notes to the default MIDI output as timestamped batches (midi_output),
+    `midi_latency_ms` ahead of when they sound. backend='async' plays
+    like 'mixer' but is timed by an asyncio player (midi_async) that waits
+    for deadlines on the monotonic clock.
+
+    `events` is a list of event dicts or a midi_events.EventStore. With
+    `midi_file` the events and lyrics are ignored and the file is played,
+    read as playback goes, at the tempo stored in it.
+
+    With a `bridge` (midi_bridge.PlaybackBridge) the position, output level
+    and jitter are pushed to it while playing. Notes made up front are
+    synthesized in `synth_pool` (a process pool) when one is given.
+    """
+
+    def __init__(self, events: List[dict], lyrics: List[tuple], tempo_getter, stop_event: threading.Event,
+                 note_cache: NoteCache = None, backend: str = 'mixer', polyphony: int = 48,
+                 midi_latency_ms: int = 20, midi_file: str = None, bridge: PlaybackBridge = None,
+                 synth_pool=None):
         super().__init__(daemon=True)
-        self.events = sorted(events, key=lambda e: e['start_beat'])
+        if isinstance(events, EventStore):
+            self.events = events.sorted()
+        else:
+            self.events = sorted(events, key=lambda e: e['start_beat'])
         self.lyrics = lyrics or []
         self.tempo_getter = tempo_getter
         self.stop_event = stop_event
+        # Synthesized buffers are kept on disk between plays and restarts
+        self.note_cache = note_cache if note_cache is not None else NoteCache()
+        self.backend = backend
+        self.polyphony = polyphony
+        self.midi_latency_ms = midi_latency_ms
+        self.sample_rate = SAMPLE_RATE
+        self.synth = Synth(SAMPLE_RATE, self.note_cache)
+        if midi_file is not None:
+            # The file's tempo events fill in the tempo map as it is read
+            tempo_map = TempoMap(DEFAULT_BPM)
+            self.timeline = MidiFileTimeline(midi_file, tempo_map)
+            self.transport = Transport(self.timeline, tempo_map)
+        else:
+            self.timeline = build_timeline(self.events, self.lyrics)
+            # Knows where playback is; seek and loop go through it
+            self.transport = Transport(self.timeline, TempoMap(tempo_getter()), tempo_getter)
         self.out = None
+        # When every event was due and when it really went out
+        self.jitter = JitterLog()
+        self.bridge = bridge
+        self.synth_pool = synth_pool
+        self.phase = 'starting'
+        # Output level 0..1; each engine sets how to measure it
+        self.level = lambda: 0.0
+        # (loop, AsyncPlayer) while the async engine plays
+        self._async = None
+
+    @property
+    def position_beat(self):
+        return self.transport.position_beat
+
+    @property
+    def length_beats(self):
+        return self.transport.length_beats
+
+    def seek(self, beat):
+        self.transport.seek(beat)
+        running = self._async
+        if running is not None:
+            # Wake the asyncio player now rather than at its next event
+            loop, player = running
+            loop.call_soon_threadsafe(player.wake)
+
+    def set_loop(self, start_beat, end_beat):
+        self.transport.set_loop(start_beat, end_beat)
+
+    def clear_loop(self):
+        self.transport.clear_loop()
+
+    def snapshot(self):
+        return {
+            'phase': self.phase,
+            'position': self.position_beat,
+            'length': self.length_beats,
+            'level': self.level(),
+            'jitter': self.jitter.summary(),
+        }
 
     def run(self):
-        # Use pygame.mixer with simple synthesized tones (sine + harmonics)
-        # Build a timeline that includes notes, chords, percussion and vocals.
+        if self.bridge is not None:
+            self.bridge.start_reporter(self.snapshot)
         try:
-            import cmath as _cmath
-            from array import array
-            import random
-
-            sample_rate = 44100
-            pygame.mixer.init(frequency=sample_rate, size=-16, channels=1)
-
-            def make_sound_for_note(note, duration_seconds, volume=0.6, timbre='lead'):
-                freq = 440.0 * (2 ** ((note - 69) / 12.0))
-                length = int(sample_rate * max(0.05, duration_seconds))
-                buf = array('h')
-                attack = int(0.01 * sample_rate)
-                release = int(0.02 * sample_rate)
-                sustain_level = 0.85
-                for i in range(length):
-                    t = i / sample_rate
-                    if timbre == 'bass':
-                        sample = float(_cmath.sin(2.0 * _cmath.pi * freq * t).real)
-                    else:
-                        s1 = float(_cmath.sin(2.0 * _cmath.pi * freq * t).real)
-                        s2 = 0.5 * float(_cmath.sin(2.0 * _cmath.pi * (freq * 2) * t).real)
-                        s3 = 0.25 * float(_cmath.sin(2.0 * _cmath.pi * (freq * 3) * t).real)
-                        sample = (s1 + s2 + s3)
-                    if i < attack and attack > 0:
-                        env = (i / attack)
-                    elif i > length - release and release > 0:
-                        env = ((length - i) / release)
-                    else:
-                        env = sustain_level
-                    val = int((sample / (1.0 + 0.5 + 0.25)) * env * volume * 32767)
-                    buf.append(max(-32768, min(32767, val)))
-                return pygame.mixer.Sound(buffer=buf)
-
-            def make_perc(kind='hat'):
-                length = int(sample_rate * 0.08)
-                buf = array('h')
-                for i in range(length):
-                    n = int((random.random() * 2 - 1) * 32767 * (1 - i / length))
-                    buf.append(n)
-                return pygame.mixer.Sound(buffer=buf)
-
-            def make_vocal(syll, duration_seconds, volume=0.7):
-                length = int(sample_rate * max(0.05, duration_seconds))
-                buf = array('h')
-                # approximate formant centers for vowels
-                formants = [800, 1150, 2900]
-                s_low = syll.lower()
-                if 'a' in s_low:
-                    formants = [800, 1150, 2900]
-                elif 'e' in s_low:
-                    formants = [400, 2000, 2600]
-                elif 'i' in s_low:
-                    formants = [240, 2400, 3200]
-                elif 'o' in s_low:
-                    formants = [500, 700, 2400]
-                elif 'u' in s_low:
-                    formants = [300, 870, 2240]
-                attack = int(0.01 * sample_rate)
-                release = int(0.02 * sample_rate)
-                for i in range(length):
-                    t = i / sample_rate
-                    s = 0.0
-                    for f in formants:
-                        s += float(_cmath.sin(2.0 * _cmath.pi * f * t).real) * 0.3
-                    if i < attack:
-                        env = i / attack
-                    elif i > length - release:
-                        env = (length - i) / release
-                    else:
-                        env = 0.9
-                    val = int(s * env * volume * 3276)
-                    buf.append(max(-32768, min(32767, val)))
-                return pygame.mixer.Sound(buffer=buf)
-
-            # Build timeline
-            timeline = []
-            for e in self.events:
-                if 'chord' in e:
-                    timeline.append(('chord_on', e['start_beat'], e))
-                    timeline.append(('chord_off', e['start_beat'] + e['duration_beats'], e))
-                elif e.get('kind') == 'perc' or e.get('channel') == 9:
-                    timeline.append(('perc_on', e['start_beat'], e))
-                    timeline.append(('perc_off', e['start_beat'] + e['duration_beats'], e))
-                else:
-                    timeline.append(('note_on', e['start_beat'], e))
-                    timeline.append(('note_off', e['start_beat'] + e['duration_beats'], e))
-            for start, syl in self.lyrics:
-                timeline.append(('vocal', start, syl))
-
-            timeline.sort(key=lambda x: x[1])
-            if not timeline:
-                return
-
-            tempo = self.tempo_getter()
-            beat_seconds = 60.0 / float(max(1, tempo))
+            self._play()
+        finally:
+            close = getattr(self.timeline, 'close', None)
+            if close is not None:
+                close()
+            self.phase = 'done'
+            self.level = lambda: 0.0
+            if self.bridge is not None:
+                self.bridge.finish(self.snapshot())
+
+    def _prewarm(self):
+        """Synthesize every note at the starting tempo, in the pool if any.
+
+        Returns ``{(note, length, timbre): samples}``; the samples also land
+        in the note cache.
+        """
+        tempo_map = self.transport.tempo_map
+        wanted = []
+        for e in self.events:
+            length = quantize_duration(e['duration_beats'] * 60.0 / tempo_map.bpm_at(e['start_beat']))
+            if 'chord' in e:
+                wanted.extend((n, length, 'lead') for n in e['chord'])
+            elif not (e.get('kind') == 'perc' or e.get('channel') == 9):
+                wanted.append((e['note'], length, timbre_for(e['note'])))
+        self.phase = 'synthesizing'
+        try:
+            return self.synth.notes(wanted, self.synth_pool)
+        finally:
+            self.phase = 'playing'
 
-            unique_notes = {e['note'] for e in self.events if isinstance(e, dict) and 'note' in e}
-            sound_cache = {}
-            for note in unique_notes:
-                timbre = 'bass' if note < 60 else 'lead'
-                sound_cache[(note, timbre)] = make_sound_for_note(note, beat_seconds, timbre=timbre)
+    def _play(self):
+        # Use pygame.mixer with simple synthesized tones (sine + harmonics).
+        # The samples come from midi_synth as int16 arrays.
+        if self.backend == 'midi':
+            try:
+                if self.timeline:
+                    self._run_midi()
+            except Exception as exc:
+                print('Playback error (midi):', exc)
+            return
+        try:
+            pygame.mixer.init(frequency=self.sample_rate, size=-16, channels=1)
+            if not self.timeline:
+                return
+            if self.backend == 'stream':
+                self._run_stream()
+            elif self.backend == 'async':
+                self._run_async()
+            else:
+                self._run_mixer()
+        except Exception as exc:
+            print('Playback error (mixer):', exc)
+        finally:
+            try:
+                pygame.mixer.quit()
+            except Exception:
+                pass
 
-            perc_sounds = {'kick': make_perc('kick'), 'snare': make_perc('snare'), 'hat': make_perc('hat')}
-            vocal_cache = {}
+    def _run_mixer(self):
+        performer = ChannelPerformer(self.synth, self.transport.tempo_map, self._prewarm())
+        self.level = performer.busy
+
+        start = time.monotonic()
+        for kind, beat, payload, at in self.transport.events():
+            # Sleep in short chunks until the event is due or a seek comes in
+            due = False
+            while not self.stop_event.is_set():
+                remaining = start + at - time.monotonic()
+                if remaining <= 0:
+                    due = True
+                    break
+                if self.transport.seek_pending:
+                    break
+                time.sleep(min(0.01, remaining))
+            if self.stop_event.is_set():
+                break
+            if not due:
+                # Drop this event; the seek's all_off is next, due now
+                self.transport.now_seconds = time.monotonic() - start
+                continue
+            performer.handle(kind, beat, payload)
+            if kind != 'all_off':
+                self.jitter.record(kind, beat, at, time.monotonic() - start)
+
+    def _run_async(self):
+        # Same sounds as the mixer engine, timed by an asyncio player
+        performer = ChannelPerformer(self.synth, self.transport.tempo_map, self._prewarm())
+        self.level = performer.busy
+
+        async def play():
+            player = AsyncPlayer(self.transport, performer.handle, jitter=self.jitter)
+            self._async = (asyncio.get_running_loop(), player)
+
+            async def watch_stop():
+                while not player.done:
+                    if self.stop_event.is_set():
+                        await player.stop()
+                        return
+                    await asyncio.sleep(0.05)
+
+            await asyncio.gather(player.play(), watch_stop())
 
-            last_beat = timeline[0][1]
-            active_notes = []
-            active_chords = []
-            for kind, beat, payload in timeline:
+        try:
+            asyncio.run(play())
+        finally:
+            self._async = None
+
+    def _run_stream(self):
+        # Events are handed to the mixer up to `horizon` ahead of the render
+        # position, each with the exact sample it should start on.
+        # Made up front; notes at other lengths are made as they come up
+        prewarmed = self._prewarm()
+        mixer = StreamMixer(polyphony=self.polyphony, sample_rate=self.sample_rate)
+        self.level = lambda: min(1.0, mixer.peak / 32768.0)
+        stream = AudioStream(mixer)
+        stream.start()
+        sr = self.sample_rate
+        horizon = int(0.25 * sr)
+
+        tempo_map = self.transport.tempo_map
+        performer = Performer(mixer, self.synth, prewarmed)
+
+        # Playback time 0 is just ahead of the render position, once the
+        # ring is full; read earlier, the opening notes would all be late
+        stream.primed.wait(1.0)
+        origin = mixer.position + stream.chunk
+        try:
+            for kind, beat, payload, seconds in self.transport.events():
                 if self.stop_event.is_set():
                     break
-                beat_delta = beat - last_beat
-                slept = 0.0
-                wait_seconds = beat_delta * (60.0 / float(max(1, self.tempo_getter())))
-                chunk = 0.01
-                while slept < wait_seconds and not self.stop_event.is_set():
-                    to_sleep = min(chunk, wait_seconds - slept)
-                    time.sleep(to_sleep)
-                    slept += to_sleep
+                at = origin + int(round(seconds * sr))
+                # Sleep until this event is within the scheduling horizon,
+                # or a seek comes in
+                while (at - mixer.position > horizon and not self.stop_event.is_set()
+                       and not self.transport.seek_pending):
+                    time.sleep(min(0.01, (at - mixer.position - horizon) / float(sr)))
                 if self.stop_event.is_set():
                     break
-                if kind == 'note_on':
-                    e = payload
-                    timbre = 'bass' if e['note'] < 60 else 'lead'
-                    snd = sound_cache.get((e['note'], timbre))
-                    if snd:
-                        ch = snd.play()
-                        active_notes.append((e['note'], ch))
-                elif kind == 'note_off':
-                    e = payload
-                    for note_playing, ch in list(active_notes):
-                        if note_playing == e['note']:
-                            try:
-                                ch.stop()
-                            except Exception:
-                                pass
-                            try:
-                                active_notes.remove((note_playing, ch))
-                            except ValueError:
-                                pass
-                elif kind == 'chord_on':
-                    e = payload
-                    chord_chs = []
-                    for n in e['chord']:
-                        snd = sound_cache.get((n, 'lead')) or make_sound_for_note(n, beat_seconds, timbre='lead')
-                        ch = snd.play()
-                        chord_chs.append((n, ch))
-                    active_chords.append((e, chord_chs))
-                elif kind == 'chord_off':
-                    e = payload
-                    for ev, chord_chs in list(active_chords):
-                        if ev is e:
-                            for n, ch in chord_chs:
-                                try:
-                                    ch.stop()
-                                except Exception:
-                                    pass
-                            try:
-                                active_chords.remove((ev, chord_chs))
-                            except ValueError:
-                                pass
-                elif kind == 'perc_on':
-                    e = payload
-                    note = e['note']
-                    if note == 36:
-                        snd = perc_sounds['kick']
-                    elif note == 38:
-                        snd = perc_sounds['snare']
-                    else:
-                        snd = perc_sounds['hat']
-                    snd.play()
-                elif kind == 'vocal':
-                    syl = payload
-                    if syl not in vocal_cache:
-                        vocal_cache[syl] = make_vocal(syl, beat_seconds, volume=0.7)
-                    vocal_cache[syl].play()
-                last_beat = beat
+                if at - mixer.position > horizon:
+                    # Drop this event and everything already handed to the
+                    # mixer; the seek's all_off is next, due now
+                    mixer.stop_all()
+                    self.transport.now_seconds = max(0.0, (mixer.position - origin) / float(sr))
+                    continue
+                # A voice scheduled behind the render position starts late
+                late = max(0, mixer.position - at) / float(sr)
+                performer.handle(kind, payload, at, 60.0 / tempo_map.bpm_at(beat))
+                if kind != 'all_off':
+                    self.jitter.record(kind, beat, seconds, seconds + late)
+                self.jitter.underruns = stream.underruns
+
+            # Let the last notes ring out
+            while (mixer.pending or mixer.active) and not self.stop_event.is_set():
+                time.sleep(0.05)
+            if not self.stop_event.is_set():
+                time.sleep(stream.latency_samples() / float(sr))
+        finally:
+            stream.stop()
 
-        except Exception as exc:
-            print('Playback error (mixer):', exc)
+    def _run_midi(self):
+        pygame.midi.init()
+        try:
+            device = pygame.midi.get_default_output_id()
+            if device < 0:
+                raise RuntimeError('no MIDI output device')
+            # A non-zero latency makes PortMidi honour the timestamps
+            self.out = pygame.midi.Output(device, latency=max(1, self.midi_latency_ms))
+            scheduler = MidiScheduler(self.out, self.transport, pygame.midi.time, stop_event=self.stop_event,
+                                      jitter=self.jitter)
+            # No audio to measure: show how many notes are held, out of 16
+            self.level = lambda: min(1.0, len(scheduler.sounding) / 16.0)
+            self.phase = 'playing'
+            scheduler.run()
         finally:
-            try:
-                pygame.mixer.quit()
-            except Exception:
-                pass
+            if self.out is not None:
+                self.out.close()
+                self.out = None
+            pygame.midi.quit()
 
 
 class MidiGUI:
@@ -250,16 +433,48 @@ class MidiGUI:
         self.stop_button.grid(row=1, column=1, pady=8)
         self.save_button = ttk.Button(main, text='Save MIDI', command=self.save_midi)
         self.save_button.grid(row=1, column=2, pady=8)
+        self.wav_button = ttk.Button(main, text='Save WAV', command=self.save_wav)
+        self.wav_button.grid(row=1, column=3, pady=8)
+        self.open_button = ttk.Button(main, text='Open MIDI...', command=self.open_midi)
+        self.open_button.grid(row=1, column=4, pady=8)
+
+        # Playback engine
+        ttk.Label(main, text='Engine:').grid(row=3, column=0, sticky='w')
+        self.backend_var = tk.StringVar(value='mixer')
+        self.backend_box = ttk.Combobox(main, textvariable=self.backend_var,
+                                        values=('mixer', 'stream', 'midi', 'async'), state='readonly', width=8)
+        self.backend_box.grid(row=3, column=1, sticky='w')
+        self.timing_button = ttk.Button(main, text='Save timing CSV', command=self.save_timing)
+        self.timing_button.grid(row=3, column=2, columnspan=2, sticky='w')
 
         # Status
         self.status = tk.StringVar(value='Ready')
-        ttk.Label(main, textvariable=self.status).grid(row=2, column=0, columnspan=3, sticky='w')
+        ttk.Label(main, textvariable=self.status).grid(row=2, column=0, columnspan=5, sticky='w')
+
+        # Position (drag to seek) and loop
+        ttk.Label(main, text='Position:').grid(row=4, column=0, sticky='w')
+        self.position_slider = ttk.Scale(main, from_=0, to=64, orient='horizontal', command=self._on_position_slider)
+        self.position_slider.grid(row=4, column=1, sticky='ew')
+        self.loop_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(main, text='Loop 4 bars', variable=self.loop_var, command=self._on_loop).grid(row=4, column=2)
+
+        # Output level
+        ttk.Label(main, text='Level:').grid(row=5, column=0, sticky='w')
+        self.level_bar = ttk.Progressbar(main, orient='horizontal', maximum=1.0)
+        self.level_bar.grid(row=5, column=1, sticky='ew')
+        self._moving_slider = False
 
         main.columnconfigure(1, weight=1)
 
         # Playback state
         self.player_thread = None
         self.stop_event = None
+        self.note_cache = NoteCache()
+        # A .mid file chosen with Open MIDI, played instead of the arrangement
+        self.midi_path = None
+        # Processes for synthesis and WAV bounces, made on first use
+        self.synth_pool = None
+        root.protocol('WM_DELETE_WINDOW', self.close)
 
     def _on_tempo_slider(self, val):
         try:
@@ -267,6 +482,33 @@ class MidiGUI:
         except Exception:
             pass
 
+    def _player_alive(self):
+        return self.player_thread is not None and self.player_thread.is_alive()
+
+    def _on_position_slider(self, val):
+        # Ignore the slider following playback, only react to the user
+        if self._moving_slider or not self._player_alive():
+            return
+        beat = float(val)
+        self.player_thread.seek(beat)
+        if self.loop_var.get():
+            # The player has not got there yet: loop around where it is going
+            self._apply_loop(beat)
+
+    def _on_loop(self):
+        if self._player_alive():
+            self._apply_loop()
+
+    def _apply_loop(self, beat=None):
+        if self.loop_var.get():
+            # Four 4/4 bars starting at the bar we're in (or seeking to)
+            if beat is None:
+                beat = self.player_thread.position_beat
+            start = int(beat // 4) * 4
+            self.player_thread.set_loop(start, start + 16)
+        else:
+            self.player_thread.clear_loop()
+
     def tempo_getter(self):
         try:
             return int(self.tempo_var.get())
@@ -277,25 +519,61 @@ class MidiGUI:
         if self.player_thread and self.player_thread.is_alive():
             return
         self.status.set('Starting...')
-        events, lyrics = build_arrangement(tempo_bpm=self.tempo_getter(), measures=16)
+        if self.midi_path:
+            events, lyrics = [], []
+        else:
+            events, lyrics = build_arrangement(tempo_bpm=self.tempo_getter(), measures=16)
         self.stop_event = threading.Event()
-        self.player_thread = MidiPlayerThread(events, lyrics, tempo_getter=self.tempo_getter, stop_event=self.stop_event)
+        try:
+            bridge = PlaybackBridge(rate_hz=UPDATE_RATE_HZ)
+            self.player_thread = MidiPlayerThread(events, lyrics, tempo_getter=self.tempo_getter,
+                                                  stop_event=self.stop_event, note_cache=self.note_cache,
+                                                  backend=self.backend_var.get(), midi_file=self.midi_path,
+                                                  bridge=bridge, synth_pool=self._pool())
+        except (OSError, ValueError) as exc:
+            messagebox.showerror('Error', f'Cannot play {self.midi_path}: {exc}')
+            self.status.set('Ready')
+            return
+        self.position_slider.config(to=max(1, self.player_thread.length_beats))
+        self._apply_loop()
         self.player_thread.start()
         self.play_button.config(state='disabled')
         self.stop_button.config(state='normal')
-        self.status.set('Playing')
-
-        # Monitor thread to update UI when finished
-        self.root.after(200, self._monitor_thread)
-
-    def _monitor_thread(self):
-        if self.player_thread and self.player_thread.is_alive():
-            self.root.after(200, self._monitor_thread)
+        # The player pushes its state; Tk picks it up on its own thread
+        bridge.attach(self.root, self._on_player_update, self._on_player_done)
+
+    def _pool(self):
+        if self.synth_pool is None:
+            # Fresh interpreters rather than forks of the Tk process
+            self.synth_pool = ProcessPoolExecutor(mp_context=multiprocessing.get_context('spawn'))
+        return self.synth_pool
+
+    def _on_player_update(self, update):
+        self._moving_slider = True
+        # A file being read as it plays gets longer as it goes
+        self.position_slider.config(to=max(1, update['length']))
+        self.position_slider.set(update['position'])
+        self._moving_slider = False
+        self.level_bar['value'] = update['level']
+        if update['phase'] == 'synthesizing':
+            self.status.set('Synthesizing notes...')
+        elif not update.get('done'):
+            self.status.set('Playing: ' + update['jitter'])
+
+    def _on_player_done(self, update):
+        self.play_button.config(state='normal')
+        self.stop_button.config(state='disabled')
+        if len(self.player_thread.jitter):
+            self.status.set('Ready (last play: {})'.format(update['jitter']))
         else:
-            self.play_button.config(state='normal')
-            self.stop_button.config(state='disabled')
             self.status.set('Ready')
 
+    def open_midi(self):
+        path = filedialog.askopenfilename(filetypes=[('MIDI files', '*.mid *.midi'), ('All files', '*')])
+        # Cancelling goes back to the built-in arrangement
+        self.midi_path = path or None
+        self.status.set('Loaded ' + os.path.basename(path) if path else 'Ready')
+
     def stop(self):
         if self.stop_event:
             self.stop_event.set()
@@ -308,6 +586,53 @@ class MidiGUI:
         except Exception as exc:
             messagebox.showerror('Error', f'Failed to write MIDI: {exc}')
 
+    def save_timing(self):
+        if self.player_thread is None or not len(self.player_thread.jitter):
+            messagebox.showinfo('Timing', 'Play something first')
+            return
+        fname = 'timing_{}.csv'.format(self.player_thread.backend)
+        try:
+            rows = self.player_thread.jitter.to_csv(fname)
+            messagebox.showinfo('Saved', f'Wrote {rows} events to {fname}')
+        except OSError as exc:
+            messagebox.showerror('Error', f'Failed to write {fname}: {exc}')
+
+    def save_wav(self):
+        try:
+            tempo = self.tempo_getter()
+            events, lyrics = build_arrangement(tempo_bpm=tempo, measures=16)
+            # Bounce in another process; the window stays usable meanwhile
+            future = self._pool().submit(bounce_in_worker, 'stonini.wav', events, lyrics, tempo_bpm=tempo,
+                                         cache_dir=self.note_cache.directory,
+                                         cache_max_bytes=self.note_cache.max_bytes)
+        except Exception as exc:
+            messagebox.showerror('Error', f'Failed to write WAV: {exc}')
+            return
+        self.wav_button.config(state='disabled')
+        self.status.set('Writing stonini.wav...')
+        self.root.after(100, self._wait_for_wav, future)
+
+    def _wait_for_wav(self, future):
+        if not future.done():
+            self.root.after(100, self._wait_for_wav, future)
+            return
+        self.wav_button.config(state='normal')
+        self.status.set('Ready')
+        # The bounce added notes to the cache directory on its own
+        self.note_cache.rescan()
+        try:
+            future.result()
+            messagebox.showinfo('Saved', 'Wrote WAV to stonini.wav')
+        except Exception as exc:
+            messagebox.showerror('Error', f'Failed to write WAV: {exc}')
+
+    def close(self):
+        if self.stop_event:
+            self.stop_event.set()
+        if self.synth_pool is not None:
+            self.synth_pool.shutdown(wait=False, cancel_futures=True)
+        self.root.destroy()
+
 
 def main():
     root = tk.Tk()
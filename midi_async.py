@@ -0,0 +1,134 @@
+"""Asyncio playback: players as coroutines instead of threads.
+
+An ``AsyncPlayer`` walks a ``Transport`` and hands each event to a
+`handle(kind, beat, payload)` callable when it is due on the monotonic
+clock. Waiting is done with ``sleep_until`` on an absolute deadline, so
+wakeup delays never add up over a song, and a pause, seek or stop wakes
+the player at once instead of after the current sleep. Any number of
+players share one event loop:
+
+    await play_together(AsyncPlayer(t1, performer1.handle),
+                        AsyncPlayer(t2, performer2.handle))
+
+``pause``, ``resume``, ``seek`` and ``stop`` are coroutines to call from
+the same loop (``wake`` is safe to schedule from another thread with
+``loop.call_soon_threadsafe``).
+"""
+import asyncio
+import time
+
+
+async def sleep_until(deadline, wake=None, clock=time.monotonic):
+    """Sleep until `clock()` reaches `deadline`.
+
+    Returns True when the deadline was reached, False if the asyncio.Event
+    `wake` was set first.
+    """
+    while True:
+        remaining = deadline - clock()
+        if remaining <= 0:
+            return True
+        if wake is None:
+            await asyncio.sleep(remaining)
+            continue
+        try:
+            await asyncio.wait_for(wake.wait(), remaining)
+            return False
+        except asyncio.TimeoutError:
+            pass
+
+
+class AsyncPlayer:
+    def __init__(self, transport, handle, clock=time.monotonic, jitter=None):
+        self.transport = transport
+        self.handle = handle
+        self.clock = clock
+        # midi_jitter.JitterLog, if timing should be recorded
+        self.jitter = jitter
+        self.origin = None
+        self.paused = False
+        self.stopped = False
+        self.done = False
+        self._changed = asyncio.Event()
+        self._resumed = asyncio.Event()
+        self._resumed.set()
+        self._holding = asyncio.Event()
+
+    def now(self):
+        """Playback seconds since the start, not counting pauses."""
+        return self.clock() - self.origin
+
+    def wake(self):
+        self._changed.set()
+
+    async def play(self):
+        self.origin = self.clock()
+        try:
+            for kind, beat, payload, seconds in self.transport.events():
+                due = await self._due(seconds)
+                if due is None:
+                    break
+                if not due:
+                    # A seek came in while waiting: this event is skipped
+                    continue
+                self.handle(kind, beat, payload)
+                if self.jitter is not None and kind != 'all_off':
+                    self.jitter.record(kind, beat, seconds, self.now())
+            if self.stopped:
+                self.handle('all_off', self.transport.position_beat, None)
+        finally:
+            self.done = True
+            self._holding.set()
+
+    async def _due(self, seconds):
+        """True when the event at `seconds` is due, False on a seek, None on stop."""
+        while True:
+            if self.stopped:
+                return None
+            if self.paused:
+                await self._hold()
+                continue
+            if self.transport.seek_pending:
+                # The next event (the seek's all_off) is due right now
+                self.transport.now_seconds = max(0.0, self.now())
+                return False
+            self._changed.clear()
+            if await sleep_until(self.origin + seconds, self._changed, self.clock):
+                return True
+
+    async def _hold(self):
+        self.handle('all_off', self.transport.position_beat, None)
+        paused_at = self.clock()
+        self._holding.set()
+        await self._resumed.wait()
+        self._holding.clear()
+        # Pick up where we left off
+        self.origin += self.clock() - paused_at
+
+    async def pause(self):
+        """Pause; returns once everything sounding has been stopped."""
+        if self.done or self.paused:
+            return
+        self.paused = True
+        self._resumed.clear()
+        self.wake()
+        await self._holding.wait()
+
+    async def resume(self):
+        self.paused = False
+        self._resumed.set()
+
+    async def seek(self, beat):
+        self.transport.seek(beat)
+        self.wake()
+
+    async def stop(self):
+        self.stopped = True
+        self.paused = False
+        self._resumed.set()
+        self.wake()
+
+
+async def play_together(*players):
+    """Play several players on this loop until all have finished."""
+    await asyncio.gather(*(player.play() for player in players))
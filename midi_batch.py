@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""Generate many Stonini variants at once.
+
+Every combination of the given tempos, lengths, transpositions and motif
+seeds becomes one MIDI file (and optionally a WAV bounce). Variants are
+independent, so they are spread over a process pool; each worker keeps its
+synthesized notes in memory, so the WAVs of a batch share their sounds.
+A ``manifest.json`` listing every variant, its parameters and its files is
+written next to them.
+
+Usage:
+    python3 midi_batch.py out/ --tempos 90,100,120 --measures 4,8 \\
+        --transpose=-2,0,2 --seeds 0..9 --wav
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import mido
+
+from midi_bounce import bounce_to_wav
+from midi_synth import SAMPLE_RATE
+
+# The hook of the song and the words sung on it
+STONINI_MOTIF = [60, 62, 62, 64, 65, 65, 65, 62, 62]
+STONINI_SYLLABLES = ['sto', 'ni', 'ni', 'ra', 'ta', 'ta', 'di', 'ni']
+STONINI_BASS = [48, 48, 53, 53]
+
+SCALE = [0, 2, 4, 5, 7, 9, 11]
+# One 4/4 bar of melody rhythm each, in beats
+RHYTHMS = [
+    [1, 1, 1, 1],
+    [1, 1, 0.5, 0.5, 1],
+    [0.5, 0.5, 0.5, 0.5, 1, 1],
+    [2, 1, 1],
+    [1, 0.5, 0.5, 2],
+]
+TICKS_PER_BEAT = 480
+# Every pitch a variant can use before transposing: motif seeds stay within
+# two octaves of the scale from middle C, the bass within STONINI_BASS
+LOWEST_NOTE = min(STONINI_BASS)
+HIGHEST_NOTE = max(max(STONINI_MOTIF), 60 + 12 + SCALE[-1])
+# Transpositions that keep every note within MIDI's 0..127
+TRANSPOSE_RANGE = (-LOWEST_NOTE, 127 - HIGHEST_NOTE)
+
+
+def motif(seed):
+    """One bar of (note, beats) for `seed`; seed 0 is the Stonini hook."""
+    if seed == 0:
+        durations = [1, 1, 1, 1, 0.5, 0.5, 0.5, 1, 1]
+        return list(zip(STONINI_MOTIF, durations))
+    rng = random.Random(seed)
+    degree = rng.randrange(len(SCALE))
+    notes = []
+    for beats in rng.choice(RHYTHMS):
+        degree = max(0, min(2 * len(SCALE) - 1, degree + rng.choice((-2, -1, 0, 1, 1, 2))))
+        octave, step = divmod(degree, len(SCALE))
+        notes.append((60 + 12 * octave + SCALE[step], beats))
+    return notes
+
+
+def build_variant(measures=8, transpose=0, seed=0):
+    """Events and lyrics in the player's format for one variant."""
+    events = []
+    lyrics = []
+    phrase = motif(seed)
+    total = measures * 4
+    beat = 0.0
+    sung = 0
+    while beat < total:
+        for note, beats in phrase:
+            if beat >= total:
+                break
+            events.append({'note': note + transpose, 'start_beat': beat,
+                           'duration_beats': min(beats, total - beat), 'channel': 0})
+            lyrics.append((beat, STONINI_SYLLABLES[sung % len(STONINI_SYLLABLES)]))
+            sung += 1
+            beat += beats
+    for bar in range(measures):
+        root = STONINI_BASS[bar % len(STONINI_BASS)] + transpose
+        for half in (0, 2):
+            events.append({'note': root, 'start_beat': bar * 4 + half, 'duration_beats': 2, 'channel': 1})
+        for b in range(4):
+            events.append({'note': 36 if b % 2 == 0 else 42, 'start_beat': bar * 4 + b,
+                           'duration_beats': 0.25, 'kind': 'perc', 'channel': 9})
+    events.sort(key=lambda e: e['start_beat'])
+    return events, lyrics
+
+
+def write_variant_midi(path, events, tempo_bpm, lyrics=(), ticks_per_beat=TICKS_PER_BEAT):
+    mid = mido.MidiFile(ticks_per_beat=ticks_per_beat)
+    track = mido.MidiTrack()
+    mid.tracks.append(track)
+    track.append(mido.MetaMessage('set_tempo', tempo=mido.bpm2tempo(tempo_bpm), time=0))
+    # (tick, order, message): at one tick note offs go first, then ons
+    messages = []
+    for e in events:
+        channel = e.get('channel', 0)
+        start = int(round(e['start_beat'] * ticks_per_beat))
+        end = int(round((e['start_beat'] + e['duration_beats']) * ticks_per_beat))
+        for n in e['chord'] if 'chord' in e else [e['note']]:
+            messages.append((start, 1, mido.Message('note_on', channel=channel, note=n,
+                                                    velocity=e.get('velocity', 90))))
+            messages.append((end, 0, mido.Message('note_off', channel=channel, note=n)))
+    for beat, syl in lyrics:
+        messages.append((int(round(beat * ticks_per_beat)), 2, mido.MetaMessage('lyrics', text=syl)))
+    messages.sort(key=lambda m: (m[0], m[1]))
+    last = 0
+    for tick, _, msg in messages:
+        msg.time = tick - last
+        track.append(msg)
+        last = tick
+    mid.save(path)
+
+
+def variant_name(v):
+    return 'stonini_t{tempo}_m{measures}_k{transpose:+d}_s{seed}'.format(**v)
+
+
+def parameter_grid(tempos, measures, transposes, seeds):
+    """Every combination of the parameters; ValueError for a transposition
+    that would take notes out of MIDI's 0..127."""
+    low, high = TRANSPOSE_RANGE
+    for k in transposes:
+        if not low <= k <= high:
+            raise ValueError('transpose {} is out of range: notes must stay within 0..127 '
+                             '(use {}..{})'.format(k, low, high))
+    return [{'tempo': t, 'measures': m, 'transpose': k, 'seed': s}
+            for t, m, k, s in itertools.product(tempos, measures, transposes, seeds)]
+
+
+class MemoryCache:
+    """Keeps synthesized notes for the life of a worker process."""
+
+    def __init__(self):
+        self.entries = {}
+
+    def get_or_make(self, key, make):
+        samples = self.entries.get(key)
+        if samples is None:
+            samples = self.entries[key] = make()
+        return samples
+
+
+_worker_cache = None
+
+
+def render_variant(job):
+    """Write one variant's files; returns its manifest entry."""
+    global _worker_cache
+    variant, out_dir, wav = job
+    started = time.perf_counter()
+    events, lyrics = build_variant(variant['measures'], variant['transpose'], variant['seed'])
+    name = variant_name(variant)
+    entry = dict(variant, name=name, events=len(events), midi=name + '.mid')
+    write_variant_midi(os.path.join(out_dir, entry['midi']), events, variant['tempo'], lyrics)
+    if wav:
+        if _worker_cache is None:
+            _worker_cache = MemoryCache()
+        entry['wav'] = name + '.wav'
+        samples = bounce_to_wav(os.path.join(out_dir, entry['wav']), events, lyrics,
+                                tempo_bpm=variant['tempo'], note_cache=_worker_cache)
+        entry['seconds'] = round(samples / float(SAMPLE_RATE), 3)
+    entry['render_seconds'] = round(time.perf_counter() - started, 4)
+    return entry
+
+
+def print_progress(done, total):
+    sys.stderr.write('\r{}/{} variants'.format(done, total))
+    if done == total:
+        sys.stderr.write('\n')
+    sys.stderr.flush()
+
+
+def run_batch(variants, out_dir, wav=False, jobs=None, progress=print_progress):
+    """Render `variants` into `out_dir` and write the manifest.
+
+    `jobs` is the number of worker processes (default: one per CPU);
+    with jobs=1 everything runs in this process.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    work = [(v, out_dir, wav) for v in variants]
+    started = time.perf_counter()
+    entries = []
+    if jobs == 1:
+        results = map(render_variant, work)
+        pool = None
+    else:
+        workers = jobs or os.cpu_count() or 1
+        pool = ProcessPoolExecutor(max_workers=workers)
+        # Several variants per task keep the pool's messaging overhead down
+        results = pool.map(render_variant, work, chunksize=max(1, len(work) // (workers * 8)))
+    try:
+        for entry in results:
+            entries.append(entry)
+            if progress is not None:
+                progress(len(entries), len(work))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    manifest = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'count': len(entries),
+        'elapsed_seconds': round(time.perf_counter() - started, 3),
+        'variants': entries,
+    }
+    with open(os.path.join(out_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=1)
+    return manifest
+
+
+def parse_ints(text):
+    """'90,100' or '0..9' (inclusive) or a mix of both."""
+    values = []
+    for part in text.split(','):
+        if '..' in part:
+            low, high = part.split('..')
+            values.extend(range(int(low), int(high) + 1))
+        elif part:
+            values.append(int(part))
+    return values
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a batch of Stonini variants')
+    parser.add_argument('output', nargs='?', default='stonini_variants')
+    parser.add_argument('--tempos', type=parse_ints, default=[100], help='BPM list, e.g. 90,100,120')
+    parser.add_argument('--measures', type=parse_ints, default=[8])
+    parser.add_argument('--transpose', type=parse_ints, default=[0], help="semitones, e.g. --transpose=-2,0,2")
+    parser.add_argument('--seeds', type=parse_ints, default=[0], help='motif seeds, e.g. 0..99 (0: original)')
+    parser.add_argument('--wav', action='store_true', help='also bounce every variant to WAV')
+    parser.add_argument('--jobs', type=int, default=None, help='worker processes (default: CPU count)')
+    args = parser.parse_args()
+
+    try:
+        variants = parameter_grid(args.tempos, args.measures, args.transpose, args.seeds)
+    except ValueError as exc:
+        parser.error(str(exc))
+    manifest = run_batch(variants, args.output, wav=args.wav, jobs=args.jobs)
+    print('Wrote {} variants to {} in {:.1f} s'.format(manifest['count'], args.output, manifest['elapsed_seconds']))
+
+
+if __name__ == '__main__':
+    main()
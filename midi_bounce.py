@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Render an arrangement to a WAV file without playing it.
+
+The events and lyrics from ``build_arrangement`` go through the same
+synthesizer and mixer as the player's ``stream`` engine, but the mixer is
+driven as fast as it can go and every block goes straight into the file.
+Only the voices that are currently sounding are in memory, so an
+arrangement of any length bounces in constant memory, far faster than real
+time.
+
+Usage:
+    python3 midi_bounce.py stonini.wav --tempo 100 --measures 16
+"""
+import argparse
+import wave
+
+from midi_mixer import Performer, StreamMixer
+from midi_synth import SAMPLE_RATE, Synth
+from midi_timeline import build_timeline
+from note_cache import DEFAULT_MAX_BYTES, NoteCache
+
+
+def bounce_to_wav(path, events, lyrics=(), tempo_bpm=100, block_size=4096, sample_rate=SAMPLE_RATE,
+                  note_cache=None, polyphony=128, tail_seconds=0.5):
+    """Write the arrangement to `path` as 16 bit mono WAV.
+
+    Returns the number of samples written.
+    """
+    timeline = build_timeline(events, lyrics)
+    beat_seconds = 60.0 / float(max(1, tempo_bpm))
+    mixer = StreamMixer(block_size=block_size, polyphony=polyphony, sample_rate=sample_rate)
+    performer = Performer(mixer, Synth(sample_rate, note_cache))
+
+    with wave.open(path, 'wb') as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(sample_rate)
+
+        first_beat = timeline[0][1] if timeline else 0.0
+        for kind, beat, payload in timeline:
+            at = int(round((beat - first_beat) * beat_seconds * sample_rate))
+            # Write every block that ends before this event starts
+            while mixer.position + block_size <= at:
+                out.writeframes(mixer.render().tobytes())
+            performer.handle(kind, payload, at, beat_seconds)
+
+        # Let the last voices ring out, plus a little silence
+        while mixer.pending or mixer.active:
+            out.writeframes(mixer.render().tobytes())
+        out.writeframes(mixer.render(int(tail_seconds * sample_rate) or 1).tobytes())
+    return mixer.position
+
+
+def bounce_in_worker(path, events, lyrics=(), tempo_bpm=100, cache_dir=None, cache_max_bytes=DEFAULT_MAX_BYTES):
+    """``bounce_to_wav`` for a process pool.
+
+    A NoteCache must not be pickled into another process: the copy would
+    change the files behind the original's back. The worker opens its own
+    on `cache_dir` instead (no cache if None); the caller should
+    ``rescan()`` its cache once the bounce is done.
+    """
+    note_cache = NoteCache(cache_dir, cache_max_bytes) if cache_dir is not None else None
+    return bounce_to_wav(path, events, lyrics, tempo_bpm=tempo_bpm, note_cache=note_cache)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bounce the Stonini arrangement to a WAV file')
+    parser.add_argument('output', nargs='?', default='stonini.wav')
+    parser.add_argument('--tempo', type=int, default=100, help='tempo in BPM')
+    parser.add_argument('--measures', type=int, default=16)
+    args = parser.parse_args()
+
+    from create_and_play_midi import build_arrangement
+
+    events, lyrics = build_arrangement(tempo_bpm=args.tempo, measures=args.measures)
+    samples = bounce_to_wav(args.output, events, lyrics, tempo_bpm=args.tempo)
+    print('Wrote {} ({:.1f} s of audio)'.format(args.output, samples / float(SAMPLE_RATE)))
+
+
+if __name__ == '__main__':
+    main()
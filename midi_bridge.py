@@ -0,0 +1,84 @@
+"""Thread-safe hand-off of playback state from the player to Tk.
+
+Tk may only be touched from its own thread, and polling the player from
+Tk (``is_alive()``, attributes) gives no steady view of progress. Instead
+a reporter thread on the player side puts snapshots (position, level,
+jitter, ...) on a bounded ``queue.Queue`` at a fixed rate, and the Tk side
+drains it from ``root.after`` and only handles the newest one. If Tk falls
+behind, old snapshots are dropped rather than piling up.
+
+Usage:
+    bridge = PlaybackBridge(rate_hz=20)
+    bridge.start_reporter(snapshot)          # player side
+    bridge.attach(root, on_update, on_done)  # Tk side
+    ...
+    bridge.finish(final_snapshot)            # player side, when done
+"""
+import queue
+import threading
+
+
+class PlaybackBridge:
+    def __init__(self, rate_hz=20, maxsize=32):
+        self.interval = 1.0 / rate_hz
+        self.queue = queue.Queue(maxsize)
+        self.finished = threading.Event()
+        self.dropped = 0
+
+    def push(self, update):
+        """Queue `update`, dropping the oldest one if the queue is full."""
+        while True:
+            try:
+                self.queue.put_nowait(update)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def start_reporter(self, snapshot):
+        """Push ``snapshot()`` every interval until ``finish`` is called."""
+        def report():
+            while not self.finished.wait(self.interval):
+                self.push(snapshot())
+
+        thread = threading.Thread(target=report, daemon=True)
+        thread.start()
+        return thread
+
+    def finish(self, update=None):
+        self.finished.set()
+        final = dict(update or {})
+        final['done'] = True
+        self.push(final)
+
+    def drain(self):
+        """The newest queued update (None if there is none)."""
+        latest = None
+        while True:
+            try:
+                update = self.queue.get_nowait()
+            except queue.Empty:
+                return latest
+            # Never let a later snapshot hide the end of playback
+            if latest is not None and latest.get('done'):
+                continue
+            latest = update
+
+    def attach(self, root, on_update, on_done=None):
+        """Deliver updates on the Tk thread until playback is done."""
+        period = max(1, int(self.interval * 1000))
+
+        def pump():
+            update = self.drain()
+            if update is not None:
+                on_update(update)
+                if update.get('done'):
+                    if on_done is not None:
+                        on_done(update)
+                    return
+            root.after(period, pump)
+
+        root.after(period, pump)
@@ -0,0 +1,187 @@
+"""Columnar storage for arrangement events.
+
+``build_arrangement`` and friends describe an arrangement as a list of
+dicts. That is easy to write but costs several hundred bytes per event, and
+building the playback timeline from it means a Python tuple per on/off.
+``EventStore`` keeps the same information in one NumPy structured array,
+one row per sounding note (a chord is several rows sharing a group), so a
+large arrangement takes a few dozen bytes per note and sorting, merging and
+timeline building are array operations.
+
+Only the fields the player uses are kept: ``note``/``chord``,
+``start_beat``, ``duration_beats``, ``kind`` and ``channel``.
+
+Usage:
+    store = EventStore.from_events(build_bass_pattern(measures=16))
+    store = EventStore.merge(store, EventStore.from_events(melody))
+    timeline = store.timeline(lyrics)
+"""
+import numpy as np
+
+EVENT_DTYPE = np.dtype([
+    ('start', np.float64),
+    ('duration', np.float64),
+    ('note', np.int16),
+    ('channel', np.int8),     # -1: not set
+    ('kind', np.uint8),       # index into EventStore.kinds, 0: not set
+    ('chord', np.bool_),
+    ('group', np.int32),      # rows of one event share a group
+])
+
+# Timeline kinds in the order the codes are numbered
+TIMELINE_KINDS = ('note_on', 'note_off', 'chord_on', 'chord_off', 'perc_on', 'perc_off', 'vocal')
+_NOTE, _CHORD, _PERC, _VOCAL = 0, 2, 4, 6
+
+
+class EventStore:
+    def __init__(self, rows=None, kinds=(None,)):
+        self.rows = rows if rows is not None else np.zeros(0, dtype=EVENT_DTYPE)
+        self.kinds = list(kinds)
+
+    @classmethod
+    def from_events(cls, events):
+        """Build a store from event dicts, keeping their order."""
+        kinds = [None]
+        kind_index = {None: 0}
+        records = []
+        for group, e in enumerate(events):
+            kind = e.get('kind')
+            if kind not in kind_index:
+                kind_index[kind] = len(kinds)
+                kinds.append(kind)
+            channel = e.get('channel')
+            channel = -1 if channel is None else channel
+            if 'chord' in e:
+                for n in e['chord']:
+                    records.append((e['start_beat'], e['duration_beats'], n, channel, kind_index[kind], True, group))
+            else:
+                records.append((e['start_beat'], e['duration_beats'], e['note'], channel, kind_index[kind], False, group))
+        return cls(np.array(records, dtype=EVENT_DTYPE), kinds)
+
+    @classmethod
+    def merge(cls, *stores):
+        """One store with the events of all `stores`, sorted by start beat."""
+        kinds = [None]
+        parts = []
+        offset = 0
+        for store in stores:
+            rows = store.rows.copy()
+            # Renumber kinds and groups so they stay unique in the result
+            remap = np.zeros(len(store.kinds), dtype=np.uint8)
+            for i, kind in enumerate(store.kinds):
+                if kind not in kinds:
+                    kinds.append(kind)
+                remap[i] = kinds.index(kind)
+            rows['kind'] = remap[rows['kind']]
+            rows['group'] += offset
+            if len(rows):
+                offset = int(rows['group'].max()) + 1
+            parts.append(rows)
+        rows = np.concatenate(parts) if parts else np.zeros(0, dtype=EVENT_DTYPE)
+        return cls(rows, kinds).sorted()
+
+    def sorted(self):
+        """A copy sorted by start beat; ties keep their order."""
+        return EventStore(self.rows[np.argsort(self.rows['start'], kind='stable')], self.kinds)
+
+    def __len__(self):
+        return len(self._group_starts())
+
+    @property
+    def nbytes(self):
+        return self.rows.nbytes
+
+    def _group_starts(self):
+        group = self.rows['group']
+        if not len(group):
+            return np.zeros(0, dtype=np.intp)
+        return np.flatnonzero(np.concatenate(([True], group[1:] != group[:-1])))
+
+    def event(self, first, count):
+        """The dict for the event whose rows are ``rows[first:first + count]``."""
+        row = self.rows[first]
+        e = {'start_beat': float(row['start']), 'duration_beats': float(row['duration'])}
+        if row['chord']:
+            e['chord'] = self.rows['note'][first:first + count].tolist()
+        else:
+            e['note'] = int(row['note'])
+        if row['kind']:
+            e['kind'] = self.kinds[row['kind']]
+        if row['channel'] >= 0:
+            e['channel'] = int(row['channel'])
+        return e
+
+    def __iter__(self):
+        starts = self._group_starts()
+        ends = np.append(starts[1:], len(self.rows))
+        for first, end in zip(starts.tolist(), ends.tolist()):
+            yield self.event(first, end - first)
+
+    def to_events(self):
+        return list(self)
+
+    def timeline(self, lyrics=()):
+        """The playback timeline, ordered like ``build_timeline`` orders it."""
+        return StoreTimeline(self, lyrics)
+
+
+class StoreTimeline:
+    """A timeline backed by arrays instead of a list of tuples.
+
+    Indexing and iterating give the same ``(kind, beat, payload)`` tuples
+    as ``build_timeline``. The payload dict of an event is made the first
+    time the event is reached and reused for its off event, so voice
+    tables that key on the event see one object.
+    """
+
+    def __init__(self, store, lyrics=()):
+        rows = store.rows
+        starts = store._group_starts()
+        counts = np.diff(np.append(starts, len(rows)))
+        first = rows[starts]
+        kind_names = np.array(store.kinds, dtype=object)
+        is_perc = (kind_names[first['kind']] == 'perc') | (first['channel'] == 9)
+        on_code = np.where(first['chord'], _CHORD, np.where(is_perc, _PERC, _NOTE)).astype(np.uint8)
+
+        lyrics = list(lyrics or ())
+        # on0, off0, on1, off1, ... then the lyrics, as build_timeline appends them
+        beats = np.concatenate((
+            np.column_stack((first['start'], first['start'] + first['duration'])).ravel(),
+            np.array([start for start, _ in lyrics], dtype=np.float64)))
+        codes = np.concatenate((
+            np.column_stack((on_code, on_code + 1)).ravel(),
+            np.full(len(lyrics), _VOCAL, dtype=np.uint8)))
+        refs = np.concatenate((np.repeat(np.arange(len(starts)), 2), np.arange(len(lyrics))))
+
+        order = np.argsort(beats, kind='stable')
+        self.beats = beats[order]
+        self.codes = codes[order]
+        self.refs = refs[order]
+        self.store = store
+        self.starts = starts
+        self.counts = counts
+        self.syllables = [syl for _, syl in lyrics]
+        self.payloads = {}
+
+    def __len__(self):
+        return len(self.beats)
+
+    def _payload(self, code, ref):
+        if code == _VOCAL:
+            return self.syllables[ref]
+        payload = self.payloads.get(ref)
+        if payload is None:
+            payload = self.payloads[ref] = self.store.event(int(self.starts[ref]), int(self.counts[ref]))
+        return payload
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self.beats)
+        if not 0 <= i < len(self.beats):
+            raise IndexError('timeline index out of range')
+        code = int(self.codes[i])
+        return (TIMELINE_KINDS[code], float(self.beats[i]), self._payload(code, int(self.refs[i])))
+
+    def __iter__(self):
+        for i in range(len(self.beats)):
+            yield self[i]
@@ -0,0 +1,311 @@
+"""Play any .mid file by reading it as playback goes.
+
+``mido.MidiFile`` decodes every track into lists of messages before anything
+can be played, which for a huge file means a long wait and all of it in
+memory. Here the file is memory-mapped and each track is decoded by its own
+generator; ``heapq.merge`` interleaves them by tick, and ``timeline_items``
+pairs note on/off messages into the ``(kind, beat, payload)`` tuples every
+player backend understands. Only the notes still sounding, and at most
+``MAX_HOLD_BEATS`` of items behind them, are held while reading, so parsing
+state stays small however long the file is.
+
+Set tempo meta events are written into the player's ``TempoMap`` as they
+are read, so the file plays at its own tempo (120 BPM until told otherwise).
+
+``MidiFileTimeline`` wraps this for ``Transport``: items are read the first
+time playback (or a seek) needs them, and playback starts after the first
+few notes have been read. Only a window of recent items is kept, so memory
+stays bounded however long the file is.
+"""
+import heapq
+import mmap
+import struct
+from bisect import bisect_left
+from collections import deque
+
+DEFAULT_BPM = 120.0
+PERC_CHANNEL = 9
+# How long a sounding note may hold back the rest of the file
+MAX_HOLD_BEATS = 8.0
+# Items a MidiFileTimeline keeps behind the newest one read
+KEEP_ITEMS = 4096
+
+# Data bytes after each channel message status (by high nibble)
+_DATA_LENGTH = {0x80: 2, 0x90: 2, 0xA0: 2, 0xB0: 2, 0xC0: 1, 0xD0: 1, 0xE0: 2}
+
+
+def read_varlen(data, pos):
+    value = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value = (value << 7) | (byte & 0x7F)
+        if not byte & 0x80:
+            return value, pos
+
+
+def read_header(data):
+    """Ticks per beat and the (start, end) byte range of every track."""
+    if data[:4] != b'MThd':
+        raise ValueError('not a MIDI file')
+    if len(data) < 14:
+        raise ValueError('MIDI header is truncated')
+    length, _, ntracks, division = struct.unpack('>IHHh', data[4:14])
+    if division <= 0:
+        raise ValueError('SMPTE time division is not supported')
+    pos = 8 + length
+    tracks = []
+    while len(tracks) < ntracks and pos + 8 <= len(data):
+        chunk, size = struct.unpack('>4sI', data[pos:pos + 8])
+        if chunk == b'MTrk':
+            tracks.append((pos + 8, min(pos + 8 + size, len(data))))
+        pos += 8 + size
+    return division, tracks
+
+
+def track_messages(data, start, end, track=0):
+    """Yield ``(tick, track, index, kind, channel, a, b)`` for one track.
+
+    `kind` is 'on', 'off' or 'tempo' (`a` is microseconds per beat); every
+    other message is skipped. Data that cannot be decoded raises
+    ValueError, like every other problem with the file.
+    """
+    pos = start
+    tick = 0
+    status = 0
+    index = 0
+    try:
+        while pos < end:
+            delta, pos = read_varlen(data, pos)
+            tick += delta
+            byte = data[pos]
+            if byte & 0x80:
+                pos += 1
+                if byte < 0xF0:
+                    status = byte   # running status applies to channel messages only
+            elif status == 0:
+                raise ValueError('running status without a status byte')
+            else:
+                byte = status
+
+            if byte == 0xFF:
+                meta = data[pos]
+                length, pos = read_varlen(data, pos + 1)
+                if meta == 0x51 and length == 3:
+                    tempo = (data[pos] << 16) | (data[pos + 1] << 8) | data[pos + 2]
+                    yield (tick, track, index, 'tempo', 0, tempo, 0)
+                    index += 1
+                elif meta == 0x2F:
+                    return
+                pos += length
+            elif byte in (0xF0, 0xF7):
+                length, pos = read_varlen(data, pos)
+                pos += length
+            elif byte >= 0xF0:
+                # System common/real-time bytes have no place in a file; skip
+                continue
+            else:
+                kind = byte & 0xF0
+                a = data[pos]
+                b = data[pos + 1] if _DATA_LENGTH[kind] == 2 else 0
+                pos += _DATA_LENGTH[kind]
+                if kind == 0x90 and b > 0:
+                    yield (tick, track, index, 'on', byte & 0x0F, a, b)
+                    index += 1
+                elif kind == 0x80 or kind == 0x90:
+                    yield (tick, track, index, 'off', byte & 0x0F, a, b)
+                    index += 1
+    except IndexError:
+        # Ran off the end of the data: a truncated or corrupt file
+        raise ValueError('MIDI track {} is truncated or corrupt'.format(track)) from None
+
+
+def merged_messages(data, tracks):
+    """All tracks' messages in tick order, merged lazily."""
+    return heapq.merge(*(track_messages(data, start, end, i) for i, (start, end) in enumerate(tracks)))
+
+
+def timeline_items(messages, ticks_per_beat, tempo_map=None, max_hold_beats=MAX_HOLD_BEATS):
+    """Turn merged messages into timeline tuples, in play order.
+
+    A note's length is only known once its note off has been read, so
+    items are held back until nothing earlier can still turn up:
+    everything before the oldest note that is still sounding (and before
+    the current tick) is final. A note still sounding `max_hold_beats`
+    after it started is not waited for any longer: its note_on goes out
+    with the length it has so far, and its duration is filled in when the
+    note off turns up (which is still played at its real time). So a long
+    or stuck note holds back at most `max_hold_beats` of the file.
+
+    At equal beats note offs come before note ons, like in
+    ``build_timeline``.
+    """
+    max_hold = max_hold_beats * ticks_per_beat
+    ready = []          # (tick, on/off order, seq, item)
+    sounding = {}       # (channel, note) -> deque of (start tick, event)
+    started = deque()   # (start tick, event) in start order, to find the oldest open note
+    sent_early = set()  # id() of events whose note_on went out before their note off
+    seq = 0
+    tick = 0
+
+    def kinds(event):
+        return ('perc_on', 'perc_off') if event['channel'] == PERC_CHANNEL else ('note_on', 'note_off')
+
+    def close(start, event, end):
+        nonlocal seq
+        event['duration_beats'] = (end - start) / float(ticks_per_beat)
+        on, off = kinds(event)
+        if id(event) in sent_early:
+            sent_early.discard(id(event))
+        else:
+            heapq.heappush(ready, (start, 1, seq, (on, event['start_beat'], event)))
+        heapq.heappush(ready, (end, 0, seq + 1, (off, end / float(ticks_per_beat), event)))
+        seq += 2
+
+    for tick, _, _, kind, channel, a, b in messages:
+        beat = tick / float(ticks_per_beat)
+        if kind == 'tempo':
+            if tempo_map is not None:
+                tempo_map.set_tempo_from(beat, 60000000.0 / a)
+        elif kind == 'on':
+            event = {'note': a, 'start_beat': beat, 'duration_beats': None, 'channel': channel, 'velocity': b}
+            sounding.setdefault((channel, a), deque()).append((tick, event))
+            started.append((tick, event))
+        else:
+            # With the same pitch held more than once, release the oldest
+            held = sounding.get((channel, a))
+            if held:
+                start, event = held.popleft()
+                if not held:
+                    del sounding[(channel, a)]
+                close(start, event, tick)
+
+        while started:
+            start, event = started[0]
+            if event['duration_beats'] is None:
+                if tick - start <= max_hold:
+                    break
+                # Held too long to wait for: send the note_on now
+                event['duration_beats'] = (tick - start) / float(ticks_per_beat)
+                sent_early.add(id(event))
+                heapq.heappush(ready, (start, 1, seq, (kinds(event)[0], event['start_beat'], event)))
+                seq += 1
+            started.popleft()
+        bound = min(started[0][0], tick) if started else tick
+        while ready and ready[0][0] < bound:
+            yield heapq.heappop(ready)[3]
+
+    # Notes never released end with the file
+    for held in sounding.values():
+        for start, event in held:
+            close(start, event, tick)
+    while ready:
+        yield heapq.heappop(ready)[3]
+
+
+class _ReadBeats:
+    """``beats`` of a MidiFileTimeline, indexed like the whole timeline."""
+
+    def __init__(self, timeline):
+        self.timeline = timeline
+
+    def __len__(self):
+        return len(self.timeline)
+
+    def __getitem__(self, i):
+        return self.timeline[i][1]
+
+
+class MidiFileTimeline:
+    """A .mid file as a timeline, read as far as playback has got.
+
+    Indexing and iterating give ``(kind, beat, payload)`` tuples like a
+    list from ``build_timeline``; ``fill`` and ``read_until`` read ahead.
+    Only the last `keep` to 2 * `keep` items read are kept; going back
+    before them (a seek back or a loop) reads the file again from the
+    start. ``index_at`` is what ``Transport`` uses to find a beat.
+    """
+
+    def __init__(self, path, tempo_map=None, keep=KEEP_ITEMS):
+        self.path = path
+        self.tempo_map = tempo_map
+        self.keep = keep
+        self.file = open(path, 'rb')
+        self.beats = _ReadBeats(self)
+        self._source = None
+        try:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.ticks_per_beat, self.tracks = read_header(self.data)
+            self.rewind()
+            self.fill(1)
+        except Exception:
+            self.close()
+            raise
+
+    def rewind(self):
+        """Forget what was read and read again from the start of the file."""
+        if self._source is not None:
+            self._source.close()
+        # The items read, from index `offset` of the whole timeline on
+        self.items = []
+        self._beats = []
+        self.offset = 0
+        self.done = False
+        self._source = timeline_items(merged_messages(self.data, self.tracks), self.ticks_per_beat,
+                                      self.tempo_map)
+
+    def _read_one(self):
+        item = next(self._source, None)
+        if item is None:
+            self.done = True
+            return False
+        self.items.append(item)
+        self._beats.append(item[1])
+        if len(self.items) > 2 * self.keep:
+            drop = len(self.items) - self.keep
+            del self.items[:drop], self._beats[:drop]
+            self.offset += drop
+        return True
+
+    def fill(self, count):
+        """Read until `count` items are known; False if the file is shorter."""
+        while len(self) < count and not self.done:
+            self._read_one()
+        return len(self) >= count
+
+    def read_until(self, beat):
+        while not self.done and (not self._beats or self._beats[-1] < beat):
+            self._read_one()
+
+    def index_at(self, beat):
+        """Index of the first item at or after `beat`, reading as needed."""
+        if self.offset and beat <= self._beats[0]:
+            # Already dropped: read the file again
+            self.rewind()
+        self.read_until(beat)
+        return self.offset + bisect_left(self._beats, beat)
+
+    def __len__(self):
+        return self.offset + len(self.items)
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if i < self.offset:
+            self.rewind()
+        if not self.fill(i + 1):
+            raise IndexError(i)
+        return self.items[i - self.offset]
+
+    def __iter__(self):
+        i = 0
+        while self.fill(i + 1):
+            yield self[i]
+            i += 1
+
+    def close(self):
+        if self._source is not None:
+            self._source.close()
+        if getattr(self, 'data', None) is not None:
+            self.data.close()
+        self.file.close()
@@ -0,0 +1,97 @@
+"""Timing instrumentation for the MIDI player engines.
+
+Each engine records, for every event it plays, when the event was due and
+when it actually went out (both in seconds from the start of playback).
+``JitterLog`` keeps those in compact arrays and summarises them as mean,
+99th percentile and maximum scheduling error, plus the engine's underrun
+count, so the engines can be compared on the same song. Count, mean and
+maximum are kept up to date as events come in and the 99th percentile is
+taken over the last ``P99_WINDOW`` events, so a summary costs the same
+however long playback has run.
+
+What "went out" means depends on the engine:
+- mixer: when ``Sound.play()`` returned, after sleeping until the event
+- stream: the sample the mixer could still place the voice on
+- midi: when the timestamped message was handed to PortMidi, if that was
+  after its timestamp (otherwise it goes out exactly on time)
+
+The player thread records and the GUI reads, so both sides take the lock.
+"""
+import csv
+import math
+import threading
+from array import array
+from collections import deque
+
+# Recent errors the 99th percentile is taken over
+P99_WINDOW = 4096
+
+
+class JitterLog:
+    def __init__(self):
+        self.kinds = []
+        self.beats = array('d')
+        self.scheduled = array('d')
+        self.actual = array('d')
+        # Set by the engine: output ran dry (stream) or went out late (midi)
+        self.underruns = 0
+        self._count = 0
+        self._sum_ms = 0.0
+        self._max_ms = 0.0
+        self._recent_ms = deque(maxlen=P99_WINDOW)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.scheduled)
+
+    def record(self, kind, beat, scheduled, actual):
+        with self._lock:
+            self.kinds.append(kind)
+            self.beats.append(beat)
+            self.scheduled.append(scheduled)
+            self.actual.append(actual)
+            error = abs(actual - scheduled) * 1000.0
+            self._count += 1
+            self._sum_ms += error
+            self._max_ms = max(self._max_ms, error)
+            self._recent_ms.append(error)
+
+    def stats(self):
+        """Count, mean/p99/max error in milliseconds and underruns.
+
+        p99 is over the last P99_WINDOW events; the rest cover them all.
+        """
+        with self._lock:
+            n = self._count
+            total = self._sum_ms
+            largest = self._max_ms
+            recent = list(self._recent_ms)
+            underruns = self.underruns
+        if not n:
+            return {'count': 0, 'mean_ms': 0.0, 'p99_ms': 0.0, 'max_ms': 0.0, 'underruns': underruns}
+        # Sorted outside the lock, so the player is never kept waiting
+        recent.sort()
+        return {
+            'count': n,
+            'mean_ms': total / n,
+            'p99_ms': recent[max(0, int(math.ceil(0.99 * len(recent))) - 1)],
+            'max_ms': largest,
+            'underruns': underruns,
+        }
+
+    def summary(self):
+        s = self.stats()
+        return 'jitter mean {:.2f} ms, p99 {:.2f} ms, max {:.2f} ms, underruns {}'.format(
+            s['mean_ms'], s['p99_ms'], s['max_ms'], s['underruns'])
+
+    def to_csv(self, path):
+        """One row per event: kind, beat, scheduled_s, actual_s, error_ms."""
+        with self._lock:
+            rows = list(zip(self.kinds, self.beats, self.scheduled, self.actual))
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['kind', 'beat', 'scheduled_s', 'actual_s', 'error_ms'])
+            for kind, beat, scheduled, actual in rows:
+                writer.writerow([kind, beat, '{:.6f}'.format(scheduled), '{:.6f}'.format(actual),
+                                 '{:.3f}'.format((actual - scheduled) * 1000.0)])
+        return len(rows)
@@ -0,0 +1,289 @@
+"""Software mixer with sample-accurate scheduling.
+
+``StreamMixer`` mixes any number of voices (int16 sample arrays) into fixed
+size blocks. Each voice starts at an absolute sample position, so an event
+lands exactly where it was scheduled no matter when the scheduling thread
+woke up, as long as it was scheduled before that block was rendered.
+There is a polyphony limit; when it is exceeded the oldest voice is faded
+out (voice stealing) instead of the new one being dropped.
+
+``AudioStream`` is the real-time side: a thread that renders blocks into a
+``PcmRing`` ring buffer ahead of time and keeps one pygame mixer channel
+fed from it, so the output never waits on the scheduler.
+
+``StreamMixer`` has no pygame dependency and can render offline.
+"""
+import heapq
+import itertools
+import threading
+import time
+
+import numpy as np
+
+from midi_synth import SAMPLE_RATE, quantize_duration
+from midi_timeline import VoiceTable, perc_kind, timbre_for
+
+# Length of the fade used when a voice is stopped or stolen (about 3 ms)
+FADE_SAMPLES = 128
+
+
+class Voice:
+    __slots__ = ('samples', 'start', 'gain', 'key', 'end', 'stolen', 'order')
+
+    def __init__(self, samples, start, gain, key, order):
+        self.samples = samples
+        self.start = start
+        self.gain = gain
+        self.key = key
+        # Absolute sample where the voice is silent (None: play to the end)
+        self.end = None
+        self.stolen = False
+        self.order = order
+
+    def __lt__(self, other):
+        return (self.start, self.order) < (other.start, other.order)
+
+
+class StreamMixer:
+    def __init__(self, block_size=512, polyphony=48, sample_rate=SAMPLE_RATE):
+        self.block_size = block_size
+        self.polyphony = polyphony
+        self.sample_rate = sample_rate
+        # Absolute sample index of the next block to render
+        self.position = 0
+        self.pending = []
+        self.active = []
+        self.stolen_count = 0
+        self.late_count = 0
+        # Loudest sample of the last block, for level meters
+        self.peak = 0.0
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+
+    def play(self, samples, at_sample, gain=1.0, key=None):
+        """Start `samples` at absolute sample `at_sample`."""
+        with self._lock:
+            if at_sample < self.position:
+                # Scheduled too late for its exact slot: play it right away
+                self.late_count += 1
+                at_sample = self.position
+            voice = Voice(samples, at_sample, gain, key, next(self._order))
+            heapq.heappush(self.pending, voice)
+            return voice
+
+    def stop(self, voice, at_sample=None):
+        """Fade `voice` out starting at `at_sample` (default: now)."""
+        with self._lock:
+            at = self.position if at_sample is None else max(at_sample, self.position)
+            end = at + FADE_SAMPLES
+            if voice.end is None or end < voice.end:
+                voice.end = end
+
+    def stop_all(self):
+        with self._lock:
+            self.pending.clear()
+            for voice in self.active:
+                voice.end = self.position + FADE_SAMPLES
+
+    def active_voices(self):
+        return sum(1 for v in self.active if not v.stolen)
+
+    def _activate(self, block_end):
+        while self.pending and self.pending[0].start < block_end:
+            voice = heapq.heappop(self.pending)
+            self.active.append(voice)
+            playing = [v for v in self.active if not v.stolen]
+            if len(playing) > self.polyphony:
+                oldest = min(playing, key=lambda v: (v.start, v.order))
+                oldest.stolen = True
+                end = max(voice.start, self.position) + FADE_SAMPLES
+                if oldest.end is None or end < oldest.end:
+                    oldest.end = end
+                self.stolen_count += 1
+
+    def render(self, frames=None):
+        """Mix the next block and return it as int16."""
+        frames = frames or self.block_size
+        with self._lock:
+            block_start = self.position
+            block_end = block_start + frames
+            self._activate(block_end)
+            out = np.zeros(frames, dtype=np.float32)
+            still_active = []
+            for voice in self.active:
+                stop_at = voice.start + len(voice.samples)
+                if voice.end is not None:
+                    stop_at = min(stop_at, voice.end)
+                first = max(block_start, voice.start)
+                last = min(block_end, stop_at)
+                if last > first:
+                    chunk = voice.samples[first - voice.start:last - voice.start].astype(np.float32)
+                    if voice.gain != 1.0:
+                        chunk *= voice.gain
+                    if voice.end is not None and last > voice.end - FADE_SAMPLES:
+                        pos = np.arange(first, last, dtype=np.float32)
+                        chunk *= np.clip((voice.end - pos) / FADE_SAMPLES, 0.0, 1.0)
+                    out[first - block_start:last - block_start] += chunk
+                if stop_at > block_end:
+                    still_active.append(voice)
+            self.active = still_active
+            self.position = block_end
+            self.peak = float(np.abs(out).max()) if frames else 0.0
+        return np.clip(out, -32768, 32767).astype(np.int16)
+
+
+class PcmRing:
+    """Fixed size ring buffer of int16 samples between renderer and output."""
+
+    def __init__(self, capacity):
+        self.buffer = np.zeros(capacity, dtype=np.int16)
+        self.capacity = capacity
+        self.read_pos = 0
+        self.write_pos = 0
+
+    def __len__(self):
+        return self.write_pos - self.read_pos
+
+    def space(self):
+        return self.capacity - len(self)
+
+    def write(self, samples):
+        n = len(samples)
+        if n > self.space():
+            raise ValueError('ring buffer overflow')
+        i = self.write_pos % self.capacity
+        first = min(n, self.capacity - i)
+        self.buffer[i:i + first] = samples[:first]
+        self.buffer[:n - first] = samples[first:]
+        self.write_pos += n
+
+    def read(self, n):
+        n = min(n, len(self))
+        i = self.read_pos % self.capacity
+        first = min(n, self.capacity - i)
+        out = np.concatenate((self.buffer[i:i + first], self.buffer[:n - first]))
+        self.read_pos += n
+        return out
+
+
+class AudioStream(threading.Thread):
+    """Feeds a StreamMixer to a pygame mixer channel continuously.
+
+    Blocks are rendered into the ring until it is full; whenever the
+    channel has nothing queued the next `chunk` samples are handed to it.
+    The mixer's render position therefore runs `ring_blocks` blocks ahead
+    of what is audible, which is the scheduling lookahead. ``primed`` is
+    set once the ring has first been filled; only then does the render
+    position say where playback will be.
+    """
+
+    def __init__(self, mixer, chunk=2048, ring_blocks=16):
+        super().__init__(daemon=True)
+        # Imported here so StreamMixer can be used without pygame
+        import pygame
+        self.pygame = pygame
+        self.mixer = mixer
+        self.chunk = chunk
+        self.ring = PcmRing(max(chunk * 2, mixer.block_size * ring_blocks))
+        self.running = threading.Event()
+        self.running.set()
+        self.channel = None
+        self.underruns = 0
+        # Set once the ring has been filled for the first time
+        self.primed = threading.Event()
+
+    def latency_samples(self):
+        return len(self.ring) + self.chunk
+
+    def run(self):
+        pygame = self.pygame
+        self.channel = pygame.mixer.find_channel(True)
+        poll = self.chunk / float(self.mixer.sample_rate) / 4
+        started = False
+        while self.running.is_set():
+            while self.ring.space() >= self.mixer.block_size:
+                self.ring.write(self.mixer.render())
+            self.primed.set()
+            if self.channel.get_queue() is None:
+                if started and not self.channel.get_busy():
+                    # The device ran dry before we could queue more
+                    self.underruns += 1
+                started = True
+                sound = pygame.mixer.Sound(buffer=self.ring.read(self.chunk))
+                if self.channel.get_busy():
+                    self.channel.queue(sound)
+                else:
+                    self.channel.play(sound)
+            time.sleep(poll)
+
+    def stop(self):
+        self.running.clear()
+        if self.channel is not None:
+            self.channel.stop()
+
+
+class Performer:
+    """Turns timeline events into StreamMixer voices.
+
+    Used by the streaming playback backend and by the offline WAV bounce,
+    so both sound the same.
+    """
+
+    def __init__(self, mixer, synth, prewarmed=None):
+        self.mixer = mixer
+        self.synth = synth
+        # (note, length, timbre) -> samples made ahead of time, as from
+        # ``Synth.notes``; notes made while playing are kept here too
+        self.notes = dict(prewarmed or {})
+        self.perc = {kind: synth.perc(kind) for kind in ('kick', 'snare', 'hat')}
+        self.voices = VoiceTable()
+
+    def note(self, note, length, timbre):
+        samples = self.notes.get((note, length, timbre))
+        if samples is None:
+            samples = self.notes[(note, length, timbre)] = self.synth.note(note, length, timbre=timbre)
+        return samples
+
+    def all_off(self, at):
+        for voice in self.voices.clear():
+            self.mixer.stop(voice, at)
+
+    def _start(self, event, note, voice, at):
+        previous = self.voices.start(event, note, voice)
+        if previous is not None:
+            self.mixer.stop(previous, at)
+
+    def _stop(self, event, note, at):
+        voice = self.voices.stop(event, note)
+        if voice is not None:
+            self.mixer.stop(voice, at)
+
+    def handle(self, kind, payload, at, beat_seconds):
+        """Play one timeline event at sample `at`.
+
+        `beat_seconds` is the length of a beat at the current tempo; note
+        lengths are worked out from it when the note starts.
+        """
+        mixer = self.mixer
+        synth = self.synth
+        if kind == 'all_off':
+            self.all_off(at)
+        elif kind == 'note_on':
+            note = payload['note']
+            length = quantize_duration(payload['duration_beats'] * beat_seconds)
+            voice = mixer.play(self.note(note, length, timbre_for(note)), at)
+            self._start(payload, note, voice, at)
+        elif kind == 'note_off':
+            self._stop(payload, payload['note'], at)
+        elif kind == 'chord_on':
+            length = quantize_duration(payload['duration_beats'] * beat_seconds)
+            for n in payload['chord']:
+                self._start(payload, n, mixer.play(self.note(n, length, 'lead'), at), at)
+        elif kind == 'chord_off':
+            for n in payload['chord']:
+                self._stop(payload, n, at)
+        elif kind == 'perc_on':
+            mixer.play(self.perc[perc_kind(payload['note'])], at)
+        elif kind == 'vocal':
+            # Lyrics have no length: sing each syllable for one beat
+            mixer.play(synth.vocal(payload, quantize_duration(beat_seconds), volume=0.7), at)
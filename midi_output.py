@@ -0,0 +1,165 @@
+"""Timestamped MIDI output for the player's ``midi`` engine.
+
+``pygame.midi.Output`` opened with a non-zero latency takes a timestamp with
+every message and lets PortMidi send it at exactly that time. The
+``MidiScheduler`` uses that to work ahead of playback: it wakes up about
+every `batch_ms`, turns every timeline event due within the next
+`lookahead_ms` into messages and hands them over in one ``write()``. Timing
+no longer depends on when the thread wakes up, and a dense arrangement
+costs a handful of wakeups per second instead of one per event.
+
+The output only needs ``write(list)`` (``[[status, data1, data2], timestamp]``
+entries, as pygame.midi takes them) and the clock is any function returning
+milliseconds, so a fake device and clock can stand in for tests.
+"""
+import time
+
+from midi_timeline import VoiceTable
+
+NOTE_OFF = 0x80
+NOTE_ON = 0x90
+CONTROL_CHANGE = 0xB0
+ALL_NOTES_OFF = 123
+PERC_CHANNEL = 9
+
+# pygame.midi.Output.write() takes at most this many messages per call
+MAX_WRITE = 1024
+
+
+class MidiScheduler:
+    def __init__(self, output, transport, clock, sleep=time.sleep, stop_event=None,
+                 lookahead_ms=500, batch_ms=250, velocity=90, jitter=None):
+        if not 0 < batch_ms < lookahead_ms:
+            raise ValueError('batch_ms must be between 0 and lookahead_ms')
+        self.output = output
+        self.transport = transport
+        self.clock = clock
+        self.sleep = sleep
+        self.stop_event = stop_event
+        self.lookahead_ms = lookahead_ms
+        self.batch_ms = batch_ms
+        self.velocity = velocity
+        # midi_jitter.JitterLog, if timing should be recorded
+        self.jitter = jitter
+        self._unlogged = []
+        self.voices = VoiceTable()
+        # (channel, note) -> how many events are holding it down
+        self.sounding = {}
+        self.channels = set()
+        self.last_stamp = 0
+        self.wakeups = 0
+        self.writes = 0
+        self.messages_sent = 0
+
+    def _stopped(self):
+        return self.stop_event is not None and self.stop_event.is_set()
+
+    def _note_on(self, batch, event, channel, note, velocity, stamp):
+        if self.voices.start(event, note, (channel, note)) is not None:
+            return
+        key = (channel, note)
+        self.sounding[key] = self.sounding.get(key, 0) + 1
+        self.channels.add(channel)
+        batch.append([[NOTE_ON | channel, note, velocity], stamp])
+
+    def _note_off(self, batch, event, note, stamp):
+        key = self.voices.stop(event, note)
+        if key is None:
+            return
+        # A pitch held by overlapping events is released by the last of them
+        count = self.sounding[key] - 1
+        if count:
+            self.sounding[key] = count
+        else:
+            del self.sounding[key]
+            batch.append([[NOTE_OFF | key[0], key[1], 0], stamp])
+
+    def all_off(self, batch, stamp):
+        self.voices.clear()
+        for channel, note in self.sounding:
+            batch.append([[NOTE_OFF | channel, note, 0], stamp])
+        self.sounding.clear()
+        for channel in sorted(self.channels):
+            batch.append([[CONTROL_CHANGE | channel, ALL_NOTES_OFF, 0], stamp])
+
+    def add_event(self, batch, kind, payload, stamp):
+        """Append the messages for one timeline event to `batch`."""
+        if kind == 'all_off':
+            self.all_off(batch, stamp)
+        elif kind == 'note_on':
+            channel = payload.get('channel', 0)
+            self._note_on(batch, payload, channel, payload['note'], payload.get('velocity', self.velocity), stamp)
+        elif kind == 'note_off':
+            self._note_off(batch, payload, payload['note'], stamp)
+        elif kind == 'chord_on':
+            channel = payload.get('channel', 0)
+            for n in payload['chord']:
+                self._note_on(batch, payload, channel, n, payload.get('velocity', self.velocity), stamp)
+        elif kind == 'chord_off':
+            for n in payload['chord']:
+                self._note_off(batch, payload, n, stamp)
+        elif kind == 'perc_on':
+            self._note_on(batch, payload, PERC_CHANNEL, payload['note'], payload.get('velocity', 100), stamp)
+        elif kind == 'perc_off':
+            self._note_off(batch, payload, payload['note'], stamp)
+        # Lyrics have no MIDI equivalent here
+
+    def flush(self, batch):
+        for i in range(0, len(batch), MAX_WRITE):
+            self.output.write(batch[i:i + MAX_WRITE])
+            self.writes += 1
+        self.messages_sent += len(batch)
+        if batch:
+            self.last_stamp = max(self.last_stamp, batch[-1][1])
+        del batch[:]
+        if self.jitter is not None:
+            self._log_sent()
+
+    def _log_sent(self):
+        # An event handed over before its timestamp goes out exactly on
+        # time; one handed over after it goes out now
+        now = self.clock()
+        for kind, beat, seconds, stamp in self._unlogged:
+            late = max(0, now - stamp)
+            if late:
+                self.jitter.underruns += 1
+            self.jitter.record(kind, beat, seconds, seconds + late / 1000.0)
+        del self._unlogged[:]
+
+    def _wait_until(self, stamp):
+        while not self._stopped():
+            remaining = stamp - self.clock()
+            if remaining <= 0:
+                return
+            self.sleep(min(0.05, remaining / 1000.0))
+
+    def run(self, start_delay_ms=50):
+        """Play the transport to the end (or until stopped)."""
+        # Playback time 0 is a little ahead so the first batch is not late
+        origin = self.clock() + start_delay_ms
+        batch = []
+        for kind, beat, payload, seconds in self.transport.events():
+            if self._stopped():
+                break
+            stamp = origin + int(round(seconds * 1000))
+            if stamp - self.clock() > self.lookahead_ms:
+                # Everything due soon is queued: hand it over and sleep
+                # until the next batch_ms worth of events is due
+                self.flush(batch)
+                self._wait_until(stamp - self.lookahead_ms + self.batch_ms)
+                self.wakeups += 1
+                if self._stopped():
+                    break
+            self.add_event(batch, kind, payload, stamp)
+            if self.jitter is not None and kind != 'all_off':
+                self._unlogged.append((kind, beat, seconds, stamp))
+        self.flush(batch)
+
+        # Already sent notes may start up to lookahead_ms from now; release
+        # everything after the last of them
+        self.all_off(batch, max(self.last_stamp, self.clock()) + 1)
+        self.flush(batch)
+        # Keep the port open until the queued messages have gone out, even
+        # when stopped, so no note is left hanging
+        while self.clock() < self.last_stamp:
+            self.sleep(min(0.05, (self.last_stamp - self.clock()) / 1000.0))
@@ -0,0 +1,225 @@
+"""Tone synthesis for gui_midi_player.py.
+
+Each function returns a mono int16 NumPy array that can be handed straight
+to ``pygame.mixer.Sound(buffer=...)``. Tones are read from precomputed
+single-cycle wavetables (one per timbre, one per vowel) with a phase
+accumulator and linear interpolation, so a note is a handful of array
+operations whatever its timbre.
+
+The envelopes and mixes match the original per-sample loops: a 10 ms linear
+attack, a flat sustain and a 20 ms linear release, with values truncated
+towards zero like ``int()`` did.
+"""
+from functools import reduce
+from math import gcd
+
+import numpy as np
+
+from note_cache import cache_key
+
+SAMPLE_RATE = 44100
+# Samples in one cycle of a wavetable
+TABLE_SIZE = 4096
+
+# Approximate formant centres for each vowel, checked in this order
+VOWEL_FORMANTS = (
+    ('a', (800, 1150, 2900)),
+    ('e', (400, 2000, 2600)),
+    ('i', (240, 2400, 3200)),
+    ('o', (500, 700, 2400)),
+    ('u', (300, 870, 2240)),
+)
+
+
+# Note lengths are rounded to this many seconds before synthesis, so a tempo
+# sweep reuses a small set of buffers instead of making one per BPM value
+DURATION_STEP = 0.01
+
+
+def quantize_duration(seconds):
+    return max(DURATION_STEP, round(seconds / DURATION_STEP) * DURATION_STEP)
+
+
+def note_frequency(note):
+    return 440.0 * (2 ** ((note - 69) / 12.0))
+
+
+def envelope(length, sustain_level, sample_rate=SAMPLE_RATE):
+    """Attack / sustain / release gain for every sample of a note."""
+    attack = int(0.01 * sample_rate)
+    release = int(0.02 * sample_rate)
+    i = np.arange(length, dtype=np.float64)
+    env = np.full(length, sustain_level, dtype=np.float64)
+    if release > 0:
+        tail = i > length - release
+        env[tail] = (length - i[tail]) / release
+    if attack > 0:
+        head = i < attack
+        env[head] = i[head] / attack
+    return env
+
+
+def to_int16(values):
+    # int() truncates towards zero, then clamp to the 16 bit range
+    return np.clip(np.trunc(values), -32768, 32767).astype(np.int16)
+
+
+class Wavetable:
+    """One cycle of a waveform made of harmonic partials.
+
+    `partials` is a list of ``(harmonic, amplitude)``. A note is rendered
+    by stepping a phase through the table and interpolating linearly, which
+    costs the same however many partials the timbre has. The table for a
+    pitch leaves out the partials at or above Nyquist, so high notes do
+    not alias; each such band-limited table is built once and kept.
+    """
+
+    def __init__(self, partials, size=TABLE_SIZE):
+        self.partials = sorted(partials)
+        # At least 64 points per cycle of the highest partial keeps the
+        # interpolation error within a sample value or two
+        self.size = max(size, 1 << (64 * self.partials[-1][0] - 1).bit_length())
+        self.tables = {}
+
+    def table(self, freq, sample_rate=SAMPLE_RATE):
+        kept = sum(1 for h, _ in self.partials if h * freq < sample_rate / 2.0)
+        table = self.tables.get(kept)
+        if table is None:
+            # One extra point so interpolation past the last entry wraps
+            x = np.arange(self.size + 1, dtype=np.float64) / self.size
+            table = np.zeros(self.size + 1, dtype=np.float64)
+            for h, amp in self.partials[:kept]:
+                table += amp * np.sin(2.0 * np.pi * h * x)
+            self.tables[kept] = table
+        return table
+
+    def render(self, freq, length, sample_rate=SAMPLE_RATE):
+        table = self.table(freq, sample_rate)
+        # The phase of every sample at once, in table positions
+        pos = np.arange(length, dtype=np.float64) * (freq / sample_rate)
+        pos -= np.floor(pos)
+        pos *= self.size
+        i = pos.astype(np.intp)
+        frac = pos - i
+        lo = table[i]
+        return lo + (table[i + 1] - lo) * frac
+
+
+# Add a timbre by adding a table; unknown names play as 'lead'
+TIMBRES = {
+    'lead': Wavetable([(1, 1.0), (2, 0.5), (3, 0.25)]),
+    'bass': Wavetable([(1, 1.0)]),
+}
+
+
+def note_samples(note, duration_seconds, volume=0.6, timbre='lead', sample_rate=SAMPLE_RATE):
+    freq = note_frequency(note)
+    length = int(sample_rate * max(0.05, duration_seconds))
+    sample = TIMBRES.get(timbre, TIMBRES['lead']).render(freq, length, sample_rate)
+    env = envelope(length, 0.85, sample_rate)
+    return to_int16((sample / (1.0 + 0.5 + 0.25)) * env * volume * 32767)
+
+
+def perc_samples(kind='hat', sample_rate=SAMPLE_RATE, rng=None):
+    # Decaying white noise; every kind currently uses the same burst
+    rng = rng if rng is not None else np.random.default_rng()
+    length = int(sample_rate * 0.08)
+    i = np.arange(length, dtype=np.float64)
+    noise = rng.random(length) * 2 - 1
+    return to_int16(noise * 32767 * (1 - i / length))
+
+
+def vowel_formants(syllable):
+    s_low = syllable.lower()
+    for vowel, formants in VOWEL_FORMANTS:
+        if vowel in s_low:
+            return formants
+    return VOWEL_FORMANTS[0][1]
+
+
+_vowel_tables = {}
+
+
+def vowel_wavetable(formants):
+    """The formant mix as one cycle at the formants' common fundamental.
+
+    The formants are whole multiples of their greatest common divisor, so
+    their sum repeats at that frequency and fits a single table.
+    """
+    entry = _vowel_tables.get(formants)
+    if entry is None:
+        fundamental = reduce(gcd, formants)
+        entry = _vowel_tables[formants] = (Wavetable([(f // fundamental, 0.3) for f in formants]), fundamental)
+    return entry
+
+
+def vocal_samples(syllable, duration_seconds, volume=0.7, sample_rate=SAMPLE_RATE):
+    length = int(sample_rate * max(0.05, duration_seconds))
+    table, fundamental = vowel_wavetable(vowel_formants(syllable))
+    s = table.render(fundamental, length, sample_rate)
+    env = envelope(length, 0.9, sample_rate)
+    return to_int16(s * env * volume * 3276)
+
+
+def _note_job(args):
+    # Module level so a process pool can pickle it
+    note, duration_seconds, volume, timbre, sample_rate = args
+    return note_samples(note, duration_seconds, volume=volume, timbre=timbre, sample_rate=sample_rate)
+
+
+class Synth:
+    """Sounds for the MIDI player, optionally backed by a NoteCache.
+
+    `cache` is anything with a ``get_or_make(key, make)`` method, normally
+    a note_cache.NoteCache.
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE, cache=None, rng=None):
+        self.sample_rate = sample_rate
+        self.cache = cache
+        self.rng = rng if rng is not None else np.random.default_rng()
+
+    def _cached(self, key, make):
+        if self.cache is None:
+            return make()
+        return self.cache.get_or_make(key, make)
+
+    def note(self, note, duration_seconds, volume=0.6, timbre='lead'):
+        key = cache_key(note, duration_seconds, timbre, volume, self.sample_rate)
+        return self._cached(key, lambda: note_samples(
+            note, duration_seconds, volume=volume, timbre=timbre, sample_rate=self.sample_rate))
+
+    def notes(self, requests, pool=None, volume=0.6):
+        """Samples for many ``(note, duration_seconds, timbre)`` at once.
+
+        Returns a dict keyed by request. Notes the cache does not have are
+        synthesized in `pool` (a concurrent.futures executor) when one is
+        given, so a long batch runs beside the caller instead of holding
+        its process's GIL.
+        """
+        result = {}
+        missing = []
+        for request in dict.fromkeys(requests):
+            note, duration_seconds, timbre = request
+            key = cache_key(note, duration_seconds, timbre, volume, self.sample_rate)
+            samples = self.cache.get(key) if self.cache is not None else None
+            if samples is None:
+                missing.append(request)
+            else:
+                result[request] = samples
+        jobs = [(n, d, volume, t, self.sample_rate) for n, d, t in missing]
+        made = pool.map(_note_job, jobs) if pool is not None else map(_note_job, jobs)
+        for request, samples in zip(missing, made):
+            if self.cache is not None:
+                note, duration_seconds, timbre = request
+                self.cache.put(cache_key(note, duration_seconds, timbre, volume, self.sample_rate), samples)
+            result[request] = samples
+        return result
+
+    def vocal(self, syllable, duration_seconds, volume=0.7):
+        key = cache_key(syllable, duration_seconds, 'vocal', volume, self.sample_rate)
+        return self._cached(key, lambda: vocal_samples(
+            syllable, duration_seconds, volume=volume, sample_rate=self.sample_rate))
+
+    def perc(self, kind='hat'):
+        return perc_samples(kind, sample_rate=self.sample_rate, rng=self.rng)
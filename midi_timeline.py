@@ -0,0 +1,238 @@
+"""Timeline of playback events for the MIDI player.
+
+An arrangement is a list of event dicts (``note`` or ``chord``,
+``start_beat``, ``duration_beats``, optional ``kind``/``channel``) plus a
+list of ``(start_beat, syllable)`` lyrics. ``build_timeline`` flattens them
+into ``(kind, beat, payload)`` tuples sorted by beat, which is what every
+playback backend and the WAV bounce walk through. An ``EventStore`` (see
+midi_events.py) gives an array-backed timeline with the same tuples.
+
+``TempoMap`` turns beats into seconds and ``Transport`` walks a timeline
+in play order with seek and loop support.
+"""
+from bisect import bisect_left, bisect_right
+
+from midi_events import EventStore
+
+
+def build_timeline(events, lyrics=()):
+    # Build a timeline that includes notes, chords, percussion and vocals.
+    if isinstance(events, EventStore):
+        return events.timeline(lyrics)
+    timeline = []
+    for e in events:
+        if 'chord' in e:
+            timeline.append(('chord_on', e['start_beat'], e))
+            timeline.append(('chord_off', e['start_beat'] + e['duration_beats'], e))
+        elif e.get('kind') == 'perc' or e.get('channel') == 9:
+            timeline.append(('perc_on', e['start_beat'], e))
+            timeline.append(('perc_off', e['start_beat'] + e['duration_beats'], e))
+        else:
+            timeline.append(('note_on', e['start_beat'], e))
+            timeline.append(('note_off', e['start_beat'] + e['duration_beats'], e))
+    for start, syl in lyrics or ():
+        timeline.append(('vocal', start, syl))
+
+    timeline.sort(key=lambda x: x[1])
+    return timeline
+
+
+def timbre_for(note):
+    return 'bass' if note < 60 else 'lead'
+
+
+def perc_kind(note):
+    if note == 36:
+        return 'kick'
+    elif note == 38:
+        return 'snare'
+    return 'hat'
+
+
+class VoiceTable:
+    """Sounding voices keyed by (event id, note).
+
+    A voice is whatever the backend uses to stop a sound (a pygame channel,
+    a mixer Voice). Every note or chord event owns its own entries, so when
+    a pitch overlaps itself each off event stops exactly the voice its own
+    on event started, and the other one keeps ringing. Start and stop are
+    dict operations, however many voices are sounding.
+
+    Events are keyed by ``id()`` because they are dicts; the timeline holds
+    on to them for the whole playback, so an id is never reused while its
+    voices are in the table.
+    """
+
+    def __init__(self):
+        self.voices = {}
+
+    def __len__(self):
+        return len(self.voices)
+
+    def start(self, event, note, voice):
+        """Record `voice` for `note` of `event`.
+
+        Returns the voice it replaces, if the same event started the same
+        note again before stopping it (a chord listing a note twice); the
+        caller should stop that one.
+        """
+        key = (id(event), note)
+        previous = self.voices.get(key)
+        self.voices[key] = voice
+        return previous
+
+    def stop(self, event, note):
+        """Forget and return the voice for `note` of `event`, or None."""
+        return self.voices.pop((id(event), note), None)
+
+    def clear(self):
+        """Forget and return every voice."""
+        voices = list(self.voices.values())
+        self.voices.clear()
+        return voices
+
+
+class TempoMap:
+    """Converts beats to seconds for a tempo that changes in steps.
+
+    Each segment starts at a beat with a BPM; the seconds at every segment
+    start are precomputed, so a conversion is one bisect plus a multiply.
+    """
+
+    def __init__(self, bpm):
+        self.beats = [0.0]
+        self.seconds = [0.0]
+        self.bpms = [float(bpm)]
+
+    def _segment(self, beat):
+        return max(0, bisect_right(self.beats, beat) - 1)
+
+    def bpm_at(self, beat):
+        return self.bpms[self._segment(beat)]
+
+    def seconds_at(self, beat):
+        i = self._segment(beat)
+        return self.seconds[i] + (beat - self.beats[i]) * 60.0 / self.bpms[i]
+
+    def beat_at(self, seconds):
+        i = max(0, bisect_right(self.seconds, seconds) - 1)
+        return self.beats[i] + (seconds - self.seconds[i]) * self.bpms[i] / 60.0
+
+    def set_tempo_from(self, beat, bpm):
+        """Use `bpm` from `beat` onwards; earlier segments are untouched."""
+        i = self._segment(beat)
+        seconds = self.seconds_at(beat)
+        del self.beats[i + 1:], self.seconds[i + 1:], self.bpms[i + 1:]
+        if beat == self.beats[i]:
+            self.bpms[i] = float(bpm)
+        else:
+            self.beats.append(beat)
+            self.seconds.append(seconds)
+            self.bpms.append(float(bpm))
+
+
+class Transport:
+    """Walks a timeline in play order, with seek and a loop region.
+
+    ``events()`` yields ``(kind, beat, payload, seconds)`` where `seconds` is
+    when the event is due, counted from the start of playback. Seeking and
+    looping find their place with a bisect on the sorted beats, so jumping
+    around a long arrangement costs nothing. Before a jump an ``all_off``
+    event is yielded so hanging notes can be stopped.
+
+    A timeline with ``fill``/``index_at`` methods (midi_import's
+    MidiFileTimeline) is read only as far as playback and seeking need.
+
+    With a `tempo_getter`, a tempo change is written into the tempo map
+    from the current beat onward, and the part already played keeps its
+    timing.
+    """
+
+    def __init__(self, timeline, tempo_map, tempo_getter=None):
+        self.timeline = timeline
+        beats = getattr(timeline, 'beats', None)
+        self.beats = beats if beats is not None else [beat for _, beat, _ in timeline]
+        self.tempo_map = tempo_map
+        self.tempo_getter = tempo_getter
+        self.position_beat = float(self.beats[0]) if len(self.beats) else 0.0
+        self.now_seconds = 0.0
+        self.loop = None
+        self._seek = None
+
+    @property
+    def length_beats(self):
+        return float(self.beats[-1]) if len(self.beats) else 0.0
+
+    def _has(self, index):
+        # A timeline read lazily (midi_import) is read up to `index` on demand
+        if index < len(self.beats):
+            return True
+        fill = getattr(self.timeline, 'fill', None)
+        return fill is not None and fill(index + 1)
+
+    def _index_at(self, beat):
+        # A lazy timeline finds the beat itself (reading, or reading again)
+        index_at = getattr(self.timeline, 'index_at', None)
+        if index_at is not None:
+            return index_at(beat)
+        return bisect_left(self.beats, beat)
+
+    def seek(self, beat):
+        # Picked up before the next event; safe to call from another thread
+        self._seek = beat
+
+    @property
+    def seek_pending(self):
+        """True between ``seek`` and the ``all_off`` that carries it out."""
+        return self._seek is not None
+
+    def set_loop(self, start_beat, end_beat):
+        if end_beat <= start_beat:
+            raise ValueError('loop end must be after loop start')
+        self.loop = (start_beat, end_beat)
+
+    def clear_loop(self):
+        self.loop = None
+
+    def events(self):
+        tempo_map = self.tempo_map
+        beats = self.beats
+        index = 0
+        base_beat = self.position_beat
+        base_seconds = 0.0
+        while True:
+            if self._seek is not None:
+                beat, self._seek = self._seek, None
+                yield ('all_off', self.position_beat, None, self.now_seconds)
+                base_beat = beat
+                base_seconds = self.now_seconds
+                index = self._index_at(beat)
+                self.position_beat = beat
+                continue
+
+            loop = self.loop
+            if loop and self.position_beat < loop[1] and (not self._has(index) or beats[index] >= loop[1]):
+                # Wrap around: the loop end is due at its own time
+                seconds = base_seconds + tempo_map.seconds_at(loop[1]) - tempo_map.seconds_at(base_beat)
+                self.now_seconds = seconds
+                yield ('all_off', loop[1], None, seconds)
+                base_beat = loop[0]
+                base_seconds = seconds
+                index = self._index_at(loop[0])
+                self.position_beat = loop[0]
+                continue
+
+            if not self._has(index):
+                return
+            kind, beat, payload = self.timeline[index]
+            index += 1
+
+            if self.tempo_getter is not None:
+                bpm = float(max(1, self.tempo_getter()))
+                if bpm != tempo_map.bpm_at(self.position_beat):
+                    tempo_map.set_tempo_from(self.position_beat, bpm)
+
+            seconds = base_seconds + tempo_map.seconds_at(beat) - tempo_map.seconds_at(base_beat)
+            self.position_beat = beat
+            self.now_seconds = seconds
+            yield (kind, beat, payload, seconds)
@@ -0,0 +1,165 @@
+"""On-disk cache of synthesized note buffers.
+
+Every note the MIDI player synthesizes is stored as raw 16 bit PCM in its
+own file, keyed by (note, duration, timbre, volume, sample_rate). Reading
+an entry back memory-maps the file, so a repeat Play or a fresh start of
+the app gets its sounds without synthesizing anything.
+
+The cache has a size cap. Entries are evicted least recently used first;
+"used" is the file's modification time, which is bumped on every hit so the
+order survives restarts.
+
+Usage:
+    cache = NoteCache()
+    samples = cache.get_or_make((60, 0.5, 'lead', 0.6, 44100),
+                                lambda: note_samples(60, 0.5))
+"""
+import hashlib
+import mmap
+import os
+import tempfile
+from collections import OrderedDict
+
+import numpy as np
+
+DEFAULT_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'pygames', 'notes')
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def cache_key(note, duration_seconds, timbre, volume, sample_rate):
+    # Round the floats so 0.6 and 0.6000000001 share an entry
+    return (note, round(float(duration_seconds), 4), timbre, round(float(volume), 3), int(sample_rate))
+
+
+class NoteCache:
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or os.environ.get('PYGAMES_NOTE_CACHE', DEFAULT_DIR)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # file name -> size, least recently used first
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            os.listdir(self.directory)
+        except OSError:
+            # No usable cache directory: behave like an always-empty cache
+            self.directory = None
+        self.rescan()
+
+    def rescan(self):
+        """Read the index back from the directory.
+
+        Another process with its own NoteCache on the same directory (a
+        bounce in a process pool) adds and evicts files this one does not
+        know about; after it is done, this brings the size cap and the LRU
+        order back in line with the disk.
+        """
+        if self.directory is None:
+            return
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        found = []
+        for name in names:
+            if name.endswith('.pcm'):
+                try:
+                    st = os.stat(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                found.append((st.st_mtime, name, st.st_size))
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        for _, name, size in sorted(found):
+            self.entries[name] = size
+            self.total_bytes += size
+        self._evict()
+
+    def _file_name(self, key):
+        return hashlib.sha1(repr(key).encode('utf-8')).hexdigest() + '.pcm'
+
+    def get(self, key):
+        """The cached int16 samples for `key`, or None."""
+        if self.directory is None:
+            return None
+        name = self._file_name(key)
+        if name not in self.entries or self.entries[name] == 0:
+            self.misses += 1
+            return None
+        path = os.path.join(self.directory, name)
+        try:
+            with open(path, 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            # The array keeps the mapping alive for as long as it is used
+            samples = np.frombuffer(mapped, dtype=np.int16)
+            os.utime(path)
+        except (OSError, ValueError):
+            # Gone, empty or an odd number of bytes: a miss, and not kept
+            self._forget(name)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            self.misses += 1
+            return None
+        self.entries.move_to_end(name)
+        self.hits += 1
+        return samples
+
+    def put(self, key, samples):
+        if self.directory is None:
+            return
+        data = np.ascontiguousarray(samples, dtype=np.int16).tobytes()
+        name = self._file_name(key)
+        path = os.path.join(self.directory, name)
+        try:
+            # A temporary file of its own, so writers in other processes or
+            # threads never share one; os.replace then swaps in whole files
+            fd, tmp = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return
+        self._forget(name)
+        self.entries[name] = len(data)
+        self.total_bytes += len(data)
+        self._evict()
+
+    def get_or_make(self, key, make):
+        samples = self.get(key)
+        if samples is None:
+            samples = make()
+            self.put(key, samples)
+        return samples
+
+    def _forget(self, name):
+        size = self.entries.pop(name, None)
+        if size is not None:
+            self.total_bytes -= size
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+            name = next(iter(self.entries))
+            self._forget(name)
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+    def clear(self):
+        for name in list(self.entries):
+            self._forget(name)
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
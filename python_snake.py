@@ -3,10 +3,18 @@
 
 import turtle
 import time
-import random
+
+from frame_pacer import FramePacer
+from snake_autopilot import Autopilot
+from snake_board import FreeCells, SnakeBody, STEPS
 
 delay = 0.1
 
+# The board is a grid of 20 pixel cells centred on the screen
+CELL = 20
+COLS = 29
+ROWS = 29
+
 # Score
 score = 10000000000000000000000000
 high_score = 0
@@ -33,9 +41,26 @@ food.speed(0)
 food.shape("triangle")
 food.color("purple")
 food.penup()
+food_cell = (COLS // 2, ROWS // 2 + 5)
 food.goto(0,100)
 
-segments = []
+# The snake itself lives on the grid; turtles only draw it
+# free_cells tracks every cell the snake is not on, for placing food
+free_cells = FreeCells(COLS, ROWS)
+snake = SnakeBody((COLS // 2, ROWS // 2), free_cells)
+
+# Press "p" to let the autopilot play
+pilot = Autopilot(COLS, ROWS)
+autopilot_on = False
+
+# The grey body is a single Tk line through the cell centres, drawn below
+# the turtles. Its width is one cell and the square caps and joins make it
+# look like a row of squares, but it is one canvas item however long the
+# snake gets.
+canvas = wn.getcanvas()
+body_line = canvas.create_line(0, 0, 0, 0, fill="grey", width=CELL,
+                               capstyle="projecting", joinstyle="miter", state="hidden")
+canvas.tag_lower(body_line)
 
 # Pen
 pen = turtle.Turtle()
@@ -64,22 +89,96 @@ def go_right():
     if head.direction != "left":
         head.direction = "right"
 
-def move():
-    if head.direction == "up":
-        y = head.ycor()
-        head.sety(y + 20)
+def toggle_autopilot():
+    global autopilot_on
+    autopilot_on = not autopilot_on
+    pilot.reset()
+
+def cell_to_screen(cell):
+    return ((cell[0] - COLS // 2) * CELL, (cell[1] - ROWS // 2) * CELL)
+
+def on_board(cell):
+    return 0 <= cell[0] < COLS and 0 <= cell[1] < ROWS
+
+def place_food():
+    global food_cell
+    # Any empty cell, picked in O(1) however full the board is
+    food_cell = free_cells.choice()
+    if food_cell is None:
+        # The snake fills the whole board
+        food.hideturtle()
+    else:
+        food.showturtle()
+        food.goto(cell_to_screen(food_cell))
+
+def canvas_point(cell):
+    # Canvas y points down, turtle y points up
+    x, y = cell
+    return ((x - COLS // 2) * CELL, (ROWS // 2 - y) * CELL)
+
+def draw_body():
+    # Sends every point: only for a reset or a snake of one or two cells
+    if len(snake) < 2:
+        canvas.itemconfigure(body_line, state="hidden")
+        return
+    coords = []
+    for cell in snake.cells:
+        coords.extend(canvas_point(cell))
+    canvas.coords(body_line, *coords)
+    canvas.itemconfigure(body_line, state="normal")
+
+def move_body(dropped):
+    # Push the new head onto the front of the line and, unless the snake
+    # grew, pop the old tail off the end. Two small edits per tick, so the
+    # frame time stays flat however long the snake gets.
+    if len(snake) <= 2:
+        draw_body()
+        return
+    canvas.insert(body_line, 0, canvas_point(snake.head))
+    if dropped is not None:
+        # The line still ends in the old tail: coordinates 2n and 2n+1
+        end = 2 * len(snake)
+        canvas.dchars(body_line, end, end + 1)
+
+def reset_game():
+    global score, delay
+    time.sleep(1)
+    pacer.reset()
+    snake.reset((COLS // 2, ROWS // 2))
+    pilot.reset()
+    head.goto(0,0)
+    place_food()
+    head.direction = "stop"
+
+    # Hide the body
+    draw_body()
+
+    # Reset the score
+    score = 0
+
+    # Reset the delay
+    delay = 0.1
+    pacer.set_interval(delay)
+
+    # Update the score display
+    pen.clear()
+    pen.write("Score: {}  High Score: {}".format(score, high_score), align="center", font=("Courier", 24, "normal"))
 
-    if head.direction == "down":
-        y = head.ycor()
-        head.sety(y - 20)
+def move():
+    if head.direction == "stop":
+        return
+    dx, dy = STEPS[head.direction]
+    x, y = snake.head
+    cell = (x + dx, y + dy)
 
-    if head.direction == "left":
-        x = head.xcor()
-        head.setx(x - 20)
+    # Check for a collision with the border or the body
+    if not on_board(cell) or snake.hits_itself(cell):
+        reset_game()
+        return
 
-    if head.direction == "right":
-        x = head.xcor()
-        head.setx(x + 20)
+    dropped = snake.move(cell)
+    head.goto(cell_to_screen(cell))
+    move_body(dropped)
 
 # Keyboard bindings
 wn.listen()
@@ -87,99 +186,42 @@ wn.onkeypress(go_up, "w")
 wn.onkeypress(go_down, "s")
 wn.onkeypress(go_left, "a")
 wn.onkeypress(go_right, "d")
+wn.onkeypress(toggle_autopilot, "p")
 
 # Main game loop
-while True:
-    wn.update()
-
-    # Check for a collision with the border
-    if head.xcor()>290 or head.xcor()<-290 or head.ycor()>290 or head.ycor()<-290:
-        time.sleep(1)
-        head.goto(0,0)
-        head.direction = "stop"
-
-        # Hide the segments
-        for segment in segments:
-            segment.goto(1000, 1000)
-        
-        # Clear the segments list
-        segments.clear()
-
-        # Reset the score
-        score = 0
-
-        # Reset the delay
-        delay = 0.1
-
-        pen.clear()
-        pen.write("Score: {}  High Score: {}".format(score, high_score), align="center", font=("Courier", 24, "normal")) 
-
-
-    # Check for a collision with the food
-    if head.distance(food) < 20:
-        # Move the food to a random spot
-        x = random.randint(-290, 290)
-        y = random.randint(-290, 290)
-        food.goto(x,y)
-
-        # Add a segment
-        new_segment = turtle.Turtle()
-        new_segment.speed(0)
-        new_segment.shape("square")
-        new_segment.color("grey")
-        new_segment.penup()
-        segments.append(new_segment)
-
-        # Shorten the delay
-        delay -= 0.001
-
-        # Increase the score
-        score += 10
-
-        if score > high_score:
-            high_score = score
-        
-        pen.clear()
-        pen.write("Score: {}  High Score: {}".format(score, high_score), align="center", font=("Courier", 24, "normal")) 
-
-    # Move the end segments first in reverse order
-    for index in range(len(segments)-1, 0, -1):
-        x = segments[index-1].xcor()
-        y = segments[index-1].ycor()
-        segments[index].goto(x, y)
-
-    # Move segment 0 to where the head is
-    if len(segments) > 0:
-        x = head.xcor()
-        y = head.ycor()
-        segments[0].goto(x,y)
-
-    move()    
-
-    # Check for head collision with the body segments
-    for segment in segments:
-        if segment.distance(head) < 20:
-            time.sleep(1)
-            head.goto(0,0)
-            head.direction = "stop"
-        
-            # Hide the segments
-            for segment in segments:
-                segment.goto(1000, 1000)
-        
-            # Clear the segments list
-            segments.clear()
-
-            # Reset the score
-            score = 0
-
-            # Reset the delay
-            delay = 0.1
-        
-            # Update the score display
+# The pacer sleeps for whatever is left of `delay` after each tick
+pacer = FramePacer(delay)
+try:
+    while True:
+        wn.update()
+
+        # Check for a collision with the food
+        if snake.head == food_cell:
+            # Add a segment
+            snake.grow()
+
+            # Move the food to a random empty cell
+            place_food()
+
+            # Shorten the delay
+            delay -= 0.001
+            pacer.set_interval(delay)
+
+            # Increase the score
+            score += 10
+
+            if score > high_score:
+                high_score = score
+
             pen.clear()
-            pen.write("Score: {}  High Score: {}".format(score, high_score), align="center", font=("Courier", 24, "normal"))
+            pen.write("Score: {}  High Score: {}".format(score, high_score), align="center", font=("Courier", 24, "normal")) 
+
+        if autopilot_on:
+            head.direction = pilot.next_direction(snake, food_cell) or head.direction
 
-    time.sleep(delay)
+        move()
 
-wn.mainloop()
\ No newline at end of file
+        pacer.tick()
+except turtle.Terminator:
+    # Window closed
+    print("Frame pacing:", pacer.summary())
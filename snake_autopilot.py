@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""Autopilot for python_snake.py.
+
+``Autopilot`` plans a shortest path from the head to the food with a
+breadth-first search and then checks that, once the food is eaten, the
+head can still reach the tail. If it can't, it follows its own tail until
+there is room again.
+
+Planning is incremental. A planned path only goes through cells that were
+free when it was planned, and only the head ever enters them, so the path
+stays valid until the food moves and is simply followed one cell per tick.
+The BFS buffers (neighbour table, visit stamps, parents, queue) are built
+once per board and reused, so re-planning never allocates per cell.
+
+Usage:
+    python3 snake_autopilot.py          # benchmark on a 100 x 100 board
+"""
+import argparse
+import random
+import time
+from array import array
+from collections import deque
+
+from snake_board import FreeCells, SnakeBody, STEPS
+
+# Direction name for each (dx, dy) step
+DIRECTIONS = {step: name for name, step in STEPS.items()}
+
+
+class Autopilot:
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        size = width * height
+        self.cell_of = [(i % width, i // width) for i in range(size)]
+        self.neighbors = []
+        for x, y in self.cell_of:
+            near = []
+            for dx, dy in STEPS.values():
+                if 0 <= x + dx < width and 0 <= y + dy < height:
+                    near.append((y + dy) * width + x + dx)
+            self.neighbors.append(tuple(near))
+        self.seen = array('i', [0] * size)
+        self.parent = array('i', [0] * size)
+        self.queue = array('i', [0] * size)
+        self.stamp = 0
+        # Cells still to walk, and what they lead to
+        self.path = deque()
+        self.target = None
+        self.plans = 0
+
+    def index(self, cell):
+        return cell[1] * self.width + cell[0]
+
+    def reset(self):
+        self.path.clear()
+        self.target = None
+
+    def _bfs(self, start, goal, occupied):
+        """Shortest path start -> goal avoiding `occupied` cells.
+
+        Returns a list of cell indices (start excluded), or None.
+        """
+        self.stamp += 1
+        stamp = self.stamp
+        seen = self.seen
+        parent = self.parent
+        queue = self.queue
+        neighbors = self.neighbors
+        cell_of = self.cell_of
+
+        seen[start] = stamp
+        queue[0] = start
+        head, tail = 0, 1
+        while head < tail:
+            i = queue[head]
+            head += 1
+            for j in neighbors[i]:
+                if seen[j] == stamp:
+                    continue
+                if j == goal:
+                    parent[j] = i
+                    path = [j]
+                    while i != start:
+                        path.append(i)
+                        i = parent[i]
+                    path.reverse()
+                    return path
+                seen[j] = stamp
+                if cell_of[j] in occupied:
+                    continue
+                parent[j] = i
+                queue[tail] = j
+                tail += 1
+        return None
+
+    def _safe_after(self, snake, path):
+        # Where will the snake be once it has walked `path` and eaten?
+        cell_of = self.cell_of
+        length = len(snake) + 1
+        body = [cell_of[i] for i in reversed(path)]
+        body.extend(snake.cells)
+        body = body[:length]
+        if len(body) < 2:
+            return True
+        occupied = set(body)
+        return self._bfs(self.index(body[0]), self.index(body[-1]), occupied) is not None
+
+    def _plan(self, snake, food):
+        self.plans += 1
+        head = self.index(snake.head)
+        if food is not None:
+            path = self._bfs(head, self.index(food), snake.occupied)
+            if path is not None and self._safe_after(snake, path):
+                self.path = deque(path)
+                self.target = food
+                return
+        # No safe way to the food: chase the tail until things open up
+        if len(snake) > 1:
+            path = self._bfs(head, self.index(snake.tail), snake.occupied)
+            if path:
+                # Stop short of the tail itself; it moves on anyway
+                self.path = deque(path[:-1] or path)
+                self.target = 'tail'
+                return
+        self.path.clear()
+        self.target = None
+
+    def next_direction(self, snake, food):
+        """Direction name for the next tick, or None if every way is blocked."""
+        if not self.path or self.target not in (food, 'tail'):
+            self._plan(snake, food)
+        elif self.target == 'tail' and food is not None and len(self.path) == 1:
+            # Tail chase is nearly done: try the food again
+            self._plan(snake, food)
+
+        hx, hy = snake.head
+        if self.path:
+            x, y = self.cell_of[self.path.popleft()]
+            step = (x - hx, y - hy)
+            if step in DIRECTIONS and not snake.hits_itself((x, y)):
+                return DIRECTIONS[step]
+            self.reset()
+
+        # Lost: take any cell that doesn't kill us
+        for name, (dx, dy) in STEPS.items():
+            cell = (hx + dx, hy + dy)
+            if 0 <= cell[0] < self.width and 0 <= cell[1] < self.height \
+                    and not snake.hits_itself(cell):
+                return name
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the snake autopilot')
+    parser.add_argument('--size', type=int, default=100)
+    parser.add_argument('--ticks', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    free = FreeCells(args.size, args.size)
+    snake = SnakeBody((args.size // 2, args.size // 2), free)
+    pilot = Autopilot(args.size, args.size)
+    food = free.choice(rng)
+    eaten = 0
+    planning = 0.0
+    ticks = 0
+    start = time.perf_counter()
+    for ticks in range(1, args.ticks + 1):
+        t0 = time.perf_counter()
+        direction = pilot.next_direction(snake, food)
+        planning += time.perf_counter() - t0
+        if direction is None:
+            break
+        dx, dy = STEPS[direction]
+        x, y = snake.head
+        cell = (x + dx, y + dy)
+        if snake.hits_itself(cell):
+            break
+        snake.move(cell)
+        if cell == food:
+            eaten += 1
+            snake.grow()
+            food = free.choice(rng)
+    elapsed = time.perf_counter() - start
+    print('{} ticks, {} food, length {}, {} plans'.format(ticks, eaten, len(snake), pilot.plans))
+    print('{:.0f} ticks/s, {:.3f} ms planning per tick'.format(
+        ticks / elapsed, planning / ticks * 1000))
+
+
+if __name__ == '__main__':
+    main()
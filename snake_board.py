@@ -0,0 +1,138 @@
+"""Grid model of the snake used by python_snake.py.
+
+The snake is a deque of (col, row) cells with the head at the left end,
+plus a set of the same cells. Moving adds the new head and drops the tail,
+and "did I run into myself?" is one set lookup, so a tick costs the same
+for a snake of 3 or 3000 cells.
+
+FreeCells keeps the opposite: every cell the snake is not on, so food can
+be dropped on a random empty cell in O(1) even when the board is nearly
+full.
+"""
+import random
+from array import array
+from collections import deque
+
+# Grid step for each direction name used by the game
+STEPS = {
+    "up": (0, 1),
+    "down": (0, -1),
+    "left": (-1, 0),
+    "right": (1, 0),
+}
+
+
+class FreeCells:
+    """The empty cells of a width x height board.
+
+    `cells[:count]` holds the index of every free cell in no particular
+    order and `slot[i]` says where cell i sits in that list (-1 when it is
+    taken). Taking a cell swaps it with the last free one, so taking,
+    giving back and picking a random free cell are all O(1).
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.reset()
+
+    def reset(self):
+        size = self.width * self.height
+        self.cells = array('i', range(size))
+        self.slot = array('i', range(size))
+        self.count = size
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, cell):
+        return self.slot[self.index(cell)] >= 0
+
+    def index(self, cell):
+        return cell[1] * self.width + cell[0]
+
+    def take(self, cell):
+        i = self.index(cell)
+        pos = self.slot[i]
+        if pos < 0:
+            return
+        last = self.count - 1
+        moved = self.cells[last]
+        self.cells[pos] = moved
+        self.slot[moved] = pos
+        self.cells[last] = i
+        self.slot[i] = -1
+        self.count = last
+
+    def give(self, cell):
+        i = self.index(cell)
+        if self.slot[i] >= 0:
+            return
+        self.cells[self.count] = i
+        self.slot[i] = self.count
+        self.count += 1
+
+    def choice(self, rng=random):
+        """A uniformly random free cell, or None when the board is full."""
+        if self.count == 0:
+            return None
+        i = self.cells[rng.randrange(self.count)]
+        return (i % self.width, i // self.width)
+
+
+class SnakeBody:
+    def __init__(self, start, free=None):
+        # `free` is an optional FreeCells kept in step with the body
+        self.free = free
+        self.reset(start)
+
+    def reset(self, start):
+        self.cells = deque([start])
+        self.occupied = {start}
+        self.pending_growth = 0
+        if self.free is not None:
+            self.free.reset()
+            self.free.take(start)
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __contains__(self, cell):
+        return cell in self.occupied
+
+    @property
+    def head(self):
+        return self.cells[0]
+
+    @property
+    def tail(self):
+        return self.cells[-1]
+
+    def grow(self, amount=1):
+        # The next moves keep the tail where it is
+        self.pending_growth += amount
+
+    def hits_itself(self, cell):
+        # The tail moves out of the way on this tick unless we're growing
+        if cell not in self.occupied:
+            return False
+        return self.pending_growth > 0 or cell != self.tail
+
+    def move(self, cell):
+        """Move the head into `cell`.
+
+        Returns the cell the tail left, or None if the snake grew.
+        """
+        dropped = None
+        if self.pending_growth > 0:
+            self.pending_growth -= 1
+        else:
+            dropped = self.cells.pop()
+            self.occupied.discard(dropped)
+            if self.free is not None:
+                self.free.give(dropped)
+        self.cells.appendleft(cell)
+        self.occupied.add(cell)
+        if self.free is not None:
+            self.free.take(cell)
+        return dropped
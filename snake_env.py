@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""Headless snake that steps many boards at once.
+
+``VecSnakeEnv`` runs N independent snake games on width x height boards.
+All state lives in NumPy arrays (one row per board), so a single ``step``
+moves every snake with a handful of array operations. It follows the old
+gym vector API: ``reset()`` returns observations and ``step(actions)``
+returns ``(obs, reward, done, info)``. Boards that finish are reset
+automatically and the returned observation is already the new game.
+
+Observation: ``(N, height, width)`` int8 board with EMPTY, BODY, HEAD and
+FOOD codes. It is the env's own array, not a copy; copy it if you keep it.
+
+Actions: 0 up, 1 right, 2 down, 3 left. Turning straight back is ignored.
+
+Usage:
+    python3 snake_env.py            # benchmark random play
+    python3 snake_env.py --render   # watch board 0 in a turtle window
+"""
+import argparse
+import time
+
+import numpy as np
+
+EMPTY, BODY, HEAD, FOOD = 0, 1, 2, 3
+
+# (dx, dy) for each action; y grows upwards like the turtle game
+ACTION_STEPS = np.array([(0, 1), (1, 0), (0, -1), (-1, 0)], dtype=np.int64)
+
+
+class VecSnakeEnv:
+    def __init__(self, num_envs, width=29, height=29, max_idle_steps=None, seed=None):
+        self.num_envs = num_envs
+        self.width = width
+        self.height = height
+        self.size = width * height
+        # End a game that goes this long without eating (default 4 x board)
+        self.max_idle_steps = max_idle_steps if max_idle_steps is not None else 4 * self.size
+        self.rng = np.random.default_rng(seed)
+
+        n = num_envs
+        self.board = np.zeros((n, height, width), dtype=np.int8)
+        self.flat = self.board.reshape(n, self.size)
+        # Each snake is a ring buffer of cell indices from tail to head
+        self.body = np.zeros((n, self.size), dtype=np.int32)
+        self.head_ptr = np.zeros(n, dtype=np.int64)
+        self.length = np.zeros(n, dtype=np.int64)
+        self.direction = np.zeros(n, dtype=np.int64)
+        self.food = np.zeros(n, dtype=np.int64)
+        self.idle = np.zeros(n, dtype=np.int64)
+        self.rows = np.arange(n)
+
+    @property
+    def heads(self):
+        return self.body[self.rows, self.head_ptr]
+
+    def reset(self):
+        self._reset_envs(self.rows)
+        return self.board
+
+    def _reset_envs(self, envs):
+        start = (self.height // 2) * self.width + self.width // 2
+        self.flat[envs] = EMPTY
+        self.body[envs, 0] = start
+        self.head_ptr[envs] = 0
+        self.length[envs] = 1
+        self.direction[envs] = 1
+        self.idle[envs] = 0
+        self.flat[envs, start] = HEAD
+        self._place_food(envs)
+
+    def _place_food(self, envs):
+        if len(envs) == 0:
+            return
+        # Random score per cell, occupied cells can't win: one argmax per
+        # board gives a uniformly random empty cell
+        scores = self.rng.random((len(envs), self.size))
+        scores[self.flat[envs] != EMPTY] = -1.0
+        cells = scores.argmax(axis=1)
+        self.food[envs] = cells
+        self.flat[envs, cells] = FOOD
+
+    def step(self, actions):
+        actions = np.asarray(actions, dtype=np.int64)
+        rows = self.rows
+        reward = np.zeros(self.num_envs, dtype=np.float32)
+
+        # Ignore 180 degree turns
+        reverse = actions == (self.direction + 2) % 4
+        self.direction = np.where(reverse, self.direction, actions)
+
+        head = self.body[rows, self.head_ptr]
+        x = head % self.width + ACTION_STEPS[self.direction, 0]
+        y = head // self.width + ACTION_STEPS[self.direction, 1]
+        off_board = (x < 0) | (x >= self.width) | (y < 0) | (y >= self.height)
+        new_head = np.where(off_board, 0, y * self.width + x)
+
+        eats = ~off_board & (new_head == self.food)
+
+        # The tail moves out of the way before the head arrives, so
+        # following your own tail is not a crash
+        moves_tail = ~off_board & ~eats
+        tail_ptr = (self.head_ptr - self.length + 1) % self.size
+        tail = self.body[rows, tail_ptr]
+        hit = self.flat[rows, new_head]
+        into_body = ((hit == BODY) | (hit == HEAD)) & ~(moves_tail & (new_head == tail))
+        crashed = off_board | into_body
+        alive = ~crashed
+
+        live = rows[alive]
+        self.flat[live, head[alive]] = BODY
+        leaving = alive & moves_tail
+        self.flat[rows[leaving], tail[leaving]] = EMPTY
+        self.head_ptr[alive] = (self.head_ptr[alive] + 1) % self.size
+        self.body[live, self.head_ptr[alive]] = new_head[alive]
+        self.flat[live, new_head[alive]] = HEAD
+        self.length[eats] += 1
+
+        self.idle += 1
+        self.idle[eats] = 0
+        reward[eats] = 1.0
+        reward[crashed] = -1.0
+
+        won = self.length == self.size
+        done = crashed | won | (self.idle >= self.max_idle_steps)
+        info = {'length': self.length.copy()}
+
+        feeding = rows[eats & ~won]
+        self._place_food(feeding)
+        finished = rows[done]
+        if len(finished):
+            self._reset_envs(finished)
+        return self.board, reward, done, info
+
+    def render(self, env=0, view=None):
+        """Draw one board in a turtle window. Returns the view to reuse."""
+        if view is None:
+            view = TurtleView(self.width, self.height)
+        view.draw(self.board[env])
+        return view
+
+
+class TurtleView:
+    # Minimal turtle display of a single board, one stamp per cell
+    colors = {BODY: 'grey', HEAD: 'green', FOOD: 'purple'}
+
+    def __init__(self, width, height, cell=20):
+        import turtle
+        self.width = width
+        self.height = height
+        self.cell = cell
+        self.screen = turtle.Screen()
+        self.screen.title('Snake env')
+        self.screen.bgcolor('orange')
+        self.screen.setup(width=width * cell + 40, height=height * cell + 40)
+        self.screen.tracer(0)
+        self.pen = turtle.Turtle()
+        self.pen.shape('square')
+        self.pen.penup()
+        self.pen.hideturtle()
+
+    def draw(self, board):
+        self.pen.clearstamps()
+        ys, xs = np.nonzero(board)
+        for x, y in zip(xs.tolist(), ys.tolist()):
+            self.pen.color(self.colors[int(board[y, x])])
+            self.pen.goto((x - self.width // 2) * self.cell, (y - self.height // 2) * self.cell)
+            self.pen.stamp()
+        self.screen.update()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark or watch the vectorized snake env')
+    parser.add_argument('--envs', type=int, default=1024)
+    parser.add_argument('--steps', type=int, default=2000)
+    parser.add_argument('--size', type=int, default=29)
+    parser.add_argument('--render', action='store_true', help='draw board 0 each step')
+    args = parser.parse_args()
+
+    env = VecSnakeEnv(args.envs, args.size, args.size, seed=0)
+    env.reset()
+    rng = np.random.default_rng(1)
+    view = None
+    start = time.perf_counter()
+    for _ in range(args.steps):
+        env.step(rng.integers(0, 4, size=args.envs))
+        if args.render:
+            view = env.render(0, view)
+            time.sleep(0.05)
+    elapsed = time.perf_counter() - start
+    print('{} env steps in {:.2f}s: {:,.0f} steps/s'.format(
+        args.envs * args.steps, elapsed, args.envs * args.steps / elapsed))
+
+
+if __name__ == '__main__':
+    main()
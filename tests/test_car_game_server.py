@@ -0,0 +1,172 @@
+import gzip
+import http.client
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'car-game')))
+from server import IMMUTABLE, REVALIDATE, make_server, parse_range
+
+SCRIPT = b'function tick() { return 1; }\n' * 200
+
+
+@pytest.fixture
+def served(tmp_path):
+    (tmp_path / 'index.html').write_bytes(b'<html>' + b' ' * 400 + b'</html>')
+    (tmp_path / 'script.js').write_bytes(SCRIPT)
+    (tmp_path / 'app.0123abcd.css').write_bytes(b'body { margin: 0; }\n' * 50)
+    (tmp_path / 'icon.png').write_bytes(bytes(range(256)) * 4)
+    (tmp_path / 'empty.txt').write_bytes(b'')
+    server = make_server(str(tmp_path), port=0, bind='127.0.0.1', threads=4)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield tmp_path, server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+
+def get(port, path, headers=None, method='GET'):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+    conn.request(method, path, headers=headers or {})
+    resp = conn.getresponse()
+    body = resp.read()
+    conn.close()
+    return resp, body
+
+
+def test_gzip_copy_is_made_and_sent(served):
+    root, port = served
+    assert (root / 'script.js.gz').exists()
+    resp, body = get(port, '/script.js', {'Accept-Encoding': 'gzip, deflate'})
+    assert resp.status == 200
+    assert resp.getheader('Content-Encoding') == 'gzip'
+    assert resp.getheader('Vary') == 'Accept-Encoding'
+    assert gzip.decompress(body) == SCRIPT
+    assert len(body) < len(SCRIPT) // 4
+
+    resp, body = get(port, '/script.js')
+    assert resp.getheader('Content-Encoding') is None
+    assert body == SCRIPT
+
+
+def test_etag_revalidation_gives_304(served):
+    _, port = served
+    resp, _ = get(port, '/script.js', {'Accept-Encoding': 'gzip'})
+    etag = resp.getheader('ETag')
+    assert resp.getheader('Cache-Control') == REVALIDATE
+    resp, body = get(port, '/script.js', {'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert resp.status == 304 and body == b''
+    # The plain and gzip copies have different tags
+    resp, _ = get(port, '/script.js', {'If-None-Match': etag})
+    assert resp.status == 200
+
+
+def test_etag_changes_with_the_file(served):
+    root, port = served
+    resp, _ = get(port, '/icon.png')
+    etag = resp.getheader('ETag')
+    (root / 'icon.png').write_bytes(b'new icon')
+    resp, body = get(port, '/icon.png', {'If-None-Match': etag})
+    assert resp.status == 200 and body == b'new icon'
+
+
+def test_range_requests(served):
+    _, port = served
+    resp, body = get(port, '/icon.png', {'Range': 'bytes=10-19', 'Accept-Encoding': 'gzip'})
+    assert resp.status == 206
+    assert body == bytes(range(10, 20))
+    assert resp.getheader('Content-Range') == 'bytes 10-19/1024'
+    assert resp.getheader('Content-Encoding') is None
+
+    resp, body = get(port, '/script.js', {'Range': 'bytes=-5'})
+    assert resp.status == 206 and body == SCRIPT[-5:]
+
+    resp, _ = get(port, '/icon.png', {'Range': 'bytes=5000-'})
+    assert resp.status == 416
+    assert resp.getheader('Content-Range') == 'bytes */1024'
+
+    resp, body = get(port, '/icon.png', {'Range': 'bytes=5-3'})
+    assert resp.status == 200 and len(body) == 1024
+
+    resp, _ = get(port, '/empty.txt', {'Range': 'bytes=-5'})
+    assert resp.status == 416
+    assert resp.getheader('Content-Range') == 'bytes */0'
+
+
+def test_parse_range():
+    assert parse_range('bytes=0-', 100) == (0, 99)
+    assert parse_range('bytes=90-200', 100) == (90, 99)
+    assert parse_range('bytes=-200', 100) == (0, 99)
+    assert parse_range('bytes=0-1,5-6', 100) is None
+    assert parse_range('items=0-1', 100) is None
+    # Bad syntax is ignored: the whole file goes out with 200
+    assert parse_range('bytes=5-3', 100) is None
+    with pytest.raises(ValueError):
+        parse_range('bytes=100-', 100)
+    # Nothing in an empty file can be satisfied (416)
+    with pytest.raises(ValueError):
+        parse_range('bytes=-5', 0)
+    with pytest.raises(ValueError):
+        parse_range('bytes=0-', 0)
+
+
+def test_hashed_assets_are_immutable(served):
+    _, port = served
+    resp, _ = get(port, '/app.0123abcd.css')
+    assert resp.getheader('Cache-Control') == IMMUTABLE
+    resp, _ = get(port, '/')
+    assert resp.getheader('Cache-Control') == REVALIDATE
+
+
+def test_index_head_and_missing(served):
+    _, port = served
+    resp, body = get(port, '/', method='HEAD')
+    assert resp.status == 200 and body == b''
+    assert int(resp.getheader('Content-Length')) == 413
+    resp, _ = get(port, '/nope.js')
+    assert resp.status == 404
+
+
+def test_keep_alive_serves_several_requests(served):
+    _, port = served
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+    for _ in range(3):
+        conn.request('GET', '/icon.png')
+        resp = conn.getresponse()
+        assert resp.status == 200 and len(resp.read()) == 1024
+    conn.close()
+
+
+def test_idle_keep_alive_clients_do_not_hold_threads(tmp_path):
+    (tmp_path / 'icon.png').write_bytes(b'x' * 100)
+    server = make_server(str(tmp_path), port=0, bind='127.0.0.1', threads=2)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    idle = []
+    try:
+        # More kept-alive connections than threads, all left open
+        for _ in range(6):
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            conn.request('GET', '/icon.png')
+            resp = conn.getresponse()
+            assert resp.status == 200 and resp.read() == b'x' * 100
+            idle.append(conn)
+        started = time.monotonic()
+        resp, body = get(port, '/icon.png')
+        assert resp.status == 200
+        assert time.monotonic() - started < 1
+        # The parked connections still work
+        idle[0].request('GET', '/icon.png')
+        assert idle[0].getresponse().read() == b'x' * 100
+    finally:
+        server.shutdown()
+        started = time.monotonic()
+        server.server_close()
+        # Open connections are closed rather than waited for
+        assert time.monotonic() - started < 2
+        for conn in idle:
+            conn.close()
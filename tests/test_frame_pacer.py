@@ -0,0 +1,44 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from frame_pacer import FramePacer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def test_sleeps_only_for_remaining_budget():
+    clock = FakeClock()
+    pacer = FramePacer(0.1, clock=clock, sleep=clock.sleep)
+    pacer.tick()
+    for work in (0.02, 0.07, 0.0):
+        clock.now += work
+        assert pacer.tick() == 0.0
+    # every frame ends exactly on the 100 ms grid
+    assert abs(clock.now - 0.3) < 1e-9
+    assert pacer.overruns == 0
+
+
+def test_overrun_is_reported_and_not_caught_up():
+    clock = FakeClock()
+    pacer = FramePacer(0.1, clock=clock, sleep=clock.sleep)
+    pacer.tick()
+    clock.now += 0.25
+    late = pacer.tick()
+    assert abs(late - 0.15) < 1e-9
+    assert pacer.overruns == 1
+    # next frame gets a full budget again
+    clock.now += 0.01
+    pacer.tick()
+    assert abs(clock.slept[-1] - 0.09) < 1e-9
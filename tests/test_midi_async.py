@@ -0,0 +1,120 @@
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from midi_async import AsyncPlayer, play_together, sleep_until
+from midi_jitter import JitterLog
+from midi_timeline import TempoMap, Transport, build_timeline
+
+# 600 BPM: one beat every 0.1 s
+BPM = 600
+
+
+def notes(count, first=60):
+    return [{'note': first + i, 'start_beat': float(i), 'duration_beats': 0.5} for i in range(count)]
+
+
+class Recorder:
+    def __init__(self, name=''):
+        self.name = name
+        self.played = []
+        self.start = time.monotonic()
+
+    def handle(self, kind, beat, payload):
+        self.played.append((self.name, kind, beat, time.monotonic() - self.start))
+
+
+def player(events, recorder, jitter=None):
+    return AsyncPlayer(Transport(build_timeline(events), TempoMap(BPM)), recorder.handle, jitter=jitter)
+
+
+def test_sleep_until_deadline_and_wake():
+    async def main():
+        loop = asyncio.get_running_loop()
+        start = time.monotonic()
+        assert await sleep_until(start + 0.05)
+        assert time.monotonic() - start >= 0.05
+
+        wake = asyncio.Event()
+        loop.call_later(0.02, wake.set)
+        started = time.monotonic()
+        assert not await sleep_until(started + 5, wake)
+        assert time.monotonic() - started < 1
+
+    asyncio.run(main())
+
+
+def test_events_play_in_order_on_time():
+    rec = Recorder()
+    jitter = JitterLog()
+    asyncio.run(player(notes(4), rec, jitter).play())
+    kinds = [k for _, k, _, _ in rec.played]
+    assert kinds.count('note_on') == 4 and kinds.count('note_off') == 4
+    beats = [b for _, _, b, _ in rec.played]
+    assert beats == sorted(beats)
+    last = rec.played[-1]
+    assert abs(last[3] - 0.35) < 0.1
+    assert len(jitter) == 8 and jitter.stats()['max_ms'] < 100
+
+
+def test_players_share_one_loop():
+    a, b = Recorder('a'), Recorder('b')
+    started = time.monotonic()
+    asyncio.run(play_together(player(notes(4), a), player(notes(4, first=40), b)))
+    # Both ran at once, not one after the other
+    assert time.monotonic() - started < 0.6
+    assert len(a.played) == len(b.played) == 8
+
+
+def test_pause_stops_sound_and_resume_shifts_the_rest():
+    rec = Recorder()
+
+    async def main():
+        p = player(notes(4), rec)
+        task = asyncio.ensure_future(p.play())
+        await asyncio.sleep(0.15)
+        await p.pause()
+        assert rec.played[-1][1] == 'all_off'
+        count = len(rec.played)
+        await asyncio.sleep(0.2)
+        assert len(rec.played) == count
+        await p.resume()
+        await task
+
+    asyncio.run(main())
+    # The song took its own 0.35 s plus the 0.2 s pause
+    assert rec.played[-1][3] >= 0.5
+
+
+def test_seek_skips_the_pending_event():
+    rec = Recorder()
+
+    async def main():
+        p = player(notes(20), rec)
+        task = asyncio.ensure_future(p.play())
+        await asyncio.sleep(0.05)
+        await p.seek(18)
+        await task
+
+    asyncio.run(main())
+    started = [b for _, k, b, _ in rec.played if k == 'note_on']
+    assert started == [0.0, 18.0, 19.0]
+    assert rec.played[-1][3] < 0.5
+
+
+def test_stop_ends_playback_with_all_off():
+    rec = Recorder()
+
+    async def main():
+        p = player(notes(20), rec)
+        task = asyncio.ensure_future(p.play())
+        await asyncio.sleep(0.05)
+        await p.stop()
+        await task
+        assert p.done
+
+    asyncio.run(main())
+    assert rec.played[-1][1] == 'all_off'
+    assert len([k for _, k, _, _ in rec.played if k == 'note_on']) == 1
@@ -0,0 +1,53 @@
+import json
+import os
+import sys
+
+import mido
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from midi_batch import TRANSPOSE_RANGE, build_variant, parameter_grid, parse_ints, run_batch
+
+
+def test_parse_ints_takes_lists_and_ranges():
+    assert parse_ints('90,100') == [90, 100]
+    assert parse_ints('0..3,-2') == [0, 1, 2, 3, -2]
+
+
+def test_variants_are_deterministic_and_transposed():
+    assert build_variant(4, 0, 7) == build_variant(4, 0, 7)
+    plain, _ = build_variant(4, 0, 3)
+    up, _ = build_variant(4, 2, 3)
+    for a, b in zip(plain, up):
+        shift = 0 if a.get('kind') == 'perc' else 2
+        assert b['note'] == a['note'] + shift
+    assert max(e['start_beat'] + e['duration_beats'] for e in plain) == 16
+
+
+def test_batch_writes_files_and_manifest(tmp_path):
+    variants = parameter_grid([90, 120], [2], [0], [0, 1])
+    seen = []
+    manifest = run_batch(variants, str(tmp_path), wav=True, jobs=2, progress=lambda done, total: seen.append(done))
+    assert seen == [1, 2, 3, 4]
+    assert manifest['count'] == 4
+    on_disk = json.loads((tmp_path / 'manifest.json').read_text())
+    assert [v['name'] for v in on_disk['variants']] == [v['name'] for v in manifest['variants']]
+    for entry in manifest['variants']:
+        mid = mido.MidiFile(str(tmp_path / entry['midi']))
+        notes = sum(1 for msg in mid.tracks[0] if msg.type == 'note_on')
+        assert notes == entry['events']
+        assert round(mid.length, 2) == round(8 * 60.0 / entry['tempo'], 2)
+        assert os.path.getsize(str(tmp_path / entry['wav'])) > 44
+
+
+def test_transpositions_must_keep_notes_in_midi_range():
+    low, high = TRANSPOSE_RANGE
+    for seed in range(50):
+        for k in (low, high):
+            events, _ = build_variant(2, k, seed)
+            assert all(0 <= e['note'] <= 127 for e in events)
+    assert len(parameter_grid([100], [4], [low, high], [0])) == 2
+    with pytest.raises(ValueError):
+        parameter_grid([100], [4], [high + 1], [0])
+    with pytest.raises(ValueError):
+        parameter_grid([100], [4], [low - 1], [0])
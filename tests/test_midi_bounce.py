@@ -0,0 +1,31 @@
+import os
+import sys
+import wave
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from midi_bounce import bounce_in_worker, bounce_to_wav
+
+
+def test_bounce_writes_the_whole_arrangement(tmp_path):
+    events = [{'note': 48 + i % 12, 'start_beat': i, 'duration_beats': 1} for i in range(8)]
+    events.append({'chord': [60, 64, 67], 'start_beat': 0, 'duration_beats': 4})
+    events.append({'note': 38, 'kind': 'perc', 'start_beat': 2, 'duration_beats': 0.5})
+    lyrics = [(0, 'sto'), (4, 'ni')]
+    out = tmp_path / 'bounce.wav'
+    samples = bounce_to_wav(str(out), events, lyrics, tempo_bpm=120, block_size=1024, tail_seconds=0.25)
+
+    with wave.open(str(out), 'rb') as w:
+        assert w.getnchannels() == 1 and w.getsampwidth() == 2
+        assert w.getnframes() == samples
+        # 8 beats at 120 BPM is 4 s, plus the tail
+        assert 4.0 * 44100 <= samples <= 4.5 * 44100
+        assert max(w.readframes(w.getnframes())) > 0
+
+
+def test_bounce_in_worker_uses_its_own_cache(tmp_path):
+    events = [{'note': 60, 'start_beat': 0, 'duration_beats': 1}]
+    out = tmp_path / 'worker.wav'
+    cache_dir = tmp_path / 'cache'
+    bounce_in_worker(str(out), events, tempo_bpm=120, cache_dir=str(cache_dir))
+    assert out.exists()
+    assert any(name.endswith('.pcm') for name in os.listdir(str(cache_dir)))
@@ -0,0 +1,53 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from midi_bridge import PlaybackBridge
+
+
+class FakeRoot:
+    def __init__(self):
+        self.calls = []
+
+    def after(self, ms, func):
+        self.calls.append(func)
+
+    def run_pending(self):
+        calls, self.calls = self.calls, []
+        for func in calls:
+            func()
+
+
+def test_full_queue_drops_oldest_and_drain_gives_newest():
+    bridge = PlaybackBridge(maxsize=3)
+    for i in range(5):
+        bridge.push({'position': i})
+    assert bridge.dropped == 2
+    assert bridge.drain() == {'position': 4}
+    assert bridge.drain() is None
+
+
+def test_done_is_never_hidden_by_a_late_snapshot():
+    bridge = PlaybackBridge()
+    bridge.finish({'position': 8})
+    bridge.push({'position': 7})
+    assert bridge.drain() == {'position': 8, 'done': True}
+
+
+def test_reporter_and_tk_side():
+    bridge = PlaybackBridge(rate_hz=200)
+    position = [0]
+    bridge.start_reporter(lambda: {'position': position[0]})
+    root = FakeRoot()
+    seen, done = [], []
+    bridge.attach(root, seen.append, done.append)
+    position[0] = 3
+    time.sleep(0.05)
+    root.run_pending()
+    assert seen and seen[-1] == {'position': 3}
+    bridge.finish({'position': 4})
+    root.run_pending()
+    assert done == [{'position': 4, 'done': True}]
+    # delivery stops after the end
+    assert root.calls == []
@@ -0,0 +1,52 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from midi_events import EventStore
+from midi_timeline import Transport, TempoMap, build_timeline
+
+
+EVENTS = [
+    {'note': 40, 'start_beat': 0, 'duration_beats': 1},
+    {'chord': [60, 64, 67], 'start_beat': 0, 'duration_beats': 2},
+    {'note': 36, 'start_beat': 1, 'duration_beats': 0.25, 'kind': 'perc'},
+    {'note': 42, 'start_beat': 1, 'duration_beats': 0.25, 'channel': 9},
+    {'note': 40, 'start_beat': 0.5, 'duration_beats': 1},
+]
+LYRICS = [(0, 'sto'), (1, 'ni')]
+
+
+def test_store_round_trips_events():
+    store = EventStore.from_events(EVENTS)
+    assert len(store) == len(EVENTS)
+    assert store.to_events() == EVENTS
+
+
+def test_store_timeline_matches_list_timeline():
+    expected = build_timeline(EVENTS, LYRICS)
+    got = list(build_timeline(EventStore.from_events(EVENTS), LYRICS))
+    assert [(k, b, p) for k, b, p in got] == [(k, float(b), p) for k, b, p in expected]
+    # on and off of one event share the payload object
+    chord_payloads = [p for k, _, p in got if k.startswith('chord')]
+    assert chord_payloads[0] is chord_payloads[1]
+
+
+def test_merge_sorts_and_keeps_groups_apart():
+    bass = EventStore.from_events([{'note': 40, 'start_beat': b, 'duration_beats': 1} for b in (0, 2)])
+    melody = EventStore.from_events([{'chord': [60, 64], 'start_beat': 1, 'duration_beats': 1, 'kind': 'pad'}])
+    merged = EventStore.merge(bass, melody)
+    assert [e['start_beat'] for e in merged] == [0, 1, 2]
+    assert merged.to_events()[1] == {'chord': [60, 64], 'start_beat': 1.0, 'duration_beats': 1.0, 'kind': 'pad'}
+    assert len(np.unique(merged.rows['group'])) == 3
+
+
+def test_transport_walks_a_store_timeline():
+    store = EventStore.from_events([{'note': 60, 'start_beat': b, 'duration_beats': 0.5} for b in range(8)])
+    transport = Transport(store.timeline(), TempoMap(60))
+    assert transport.length_beats == 7.5
+    transport.seek(6)
+    seen = [(kind, beat) for kind, beat, _, _ in transport.events()]
+    assert seen[0][0] == 'all_off'
+    assert seen[1:] == [('note_on', 6.0), ('note_off', 6.5), ('note_on', 7.0), ('note_off', 7.5)]
@@ -0,0 +1,136 @@
+import os
+import sys
+
+import mido
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from midi_import import MidiFileTimeline
+from midi_timeline import TempoMap, Transport
+
+
+def write_file(path, tracks, ticks_per_beat=480):
+    mid = mido.MidiFile(ticks_per_beat=ticks_per_beat)
+    for messages in tracks:
+        track = mido.MidiTrack()
+        track.extend(messages)
+        mid.tracks.append(track)
+    mid.save(str(path))
+    return str(path)
+
+
+def test_tracks_are_merged_into_timeline_order(tmp_path):
+    bass = [mido.Message('note_on', note=40, velocity=80, time=0),
+            mido.Message('note_off', note=40, time=960)]
+    # running status and note_on with velocity 0 as note off
+    melody = [mido.Message('note_on', note=64, velocity=70, time=480),
+              mido.Message('note_on', note=64, velocity=0, time=480),
+              mido.Message('note_on', note=36, velocity=100, channel=9, time=0),
+              mido.Message('note_off', note=36, channel=9, time=240)]
+    path = write_file(tmp_path / 'song.mid', [bass, melody])
+    timeline = MidiFileTimeline(path)
+    items = [(kind, beat, payload['note']) for kind, beat, payload in timeline]
+    timeline.close()
+    assert items == [
+        ('note_on', 0.0, 40),
+        ('note_on', 1.0, 64),
+        ('note_off', 2.0, 40),
+        ('note_off', 2.0, 64),
+        ('perc_on', 2.0, 36),
+        ('perc_off', 2.5, 36),
+    ]
+
+
+def test_overlapping_pitch_releases_oldest_first(tmp_path):
+    messages = [mido.Message('note_on', note=60, velocity=90, time=0),
+                mido.Message('note_on', note=60, velocity=50, time=480),
+                mido.Message('note_off', note=60, time=480),
+                mido.Message('note_off', note=60, time=480)]
+    timeline = MidiFileTimeline(write_file(tmp_path / 'overlap.mid', [messages]))
+    notes = [(p['velocity'], p['start_beat'], p['duration_beats']) for kind, _, p in timeline if kind == 'note_on']
+    timeline.close()
+    assert notes == [(90, 0.0, 2.0), (50, 1.0, 2.0)]
+
+
+def test_reading_is_lazy_and_feeds_the_tempo_map(tmp_path):
+    messages = [mido.MetaMessage('set_tempo', tempo=500000, time=0)]
+    for i in range(2000):
+        messages.append(mido.Message('note_on', note=60, velocity=90, time=0 if i == 0 else 240))
+        messages.append(mido.Message('note_off', note=60, time=240))
+        if i == 8:
+            messages.append(mido.MetaMessage('set_tempo', tempo=1000000, time=0))
+    tempo_map = TempoMap(100)
+    timeline = MidiFileTimeline(write_file(tmp_path / 'long.mid', [messages]), tempo_map)
+    assert not timeline.done
+    assert len(timeline) < 10
+
+    transport = Transport(timeline, tempo_map)
+    played = []
+    for kind, beat, payload, seconds in transport.events():
+        played.append((beat, seconds))
+        if len(played) == 20:
+            break
+    assert not timeline.done
+    # 120 BPM up to the change after the ninth note (beat 8.5), then 60 BPM
+    assert tempo_map.bpm_at(0) == 120.0
+    assert tempo_map.bpm_at(9) == 60.0
+    assert played[-1] == (9.5, 4.25 + 1.0)
+    timeline.close()
+
+
+def test_a_held_note_does_not_hold_back_the_file(tmp_path):
+    # A pedal note held over 1000 short notes on another channel
+    messages = [mido.Message('note_on', note=36, velocity=90, channel=1, time=0)]
+    for i in range(1000):
+        messages.append(mido.Message('note_on', note=60, velocity=90, time=0 if i == 0 else 240))
+        messages.append(mido.Message('note_off', note=60, time=240))
+    messages.append(mido.Message('note_off', note=36, channel=1, time=0))
+    timeline = MidiFileTimeline(write_file(tmp_path / 'pedal.mid', [messages]))
+    assert timeline.fill(40)
+    assert not timeline.done
+    pedal = [timeline[i] for i in range(40) if timeline[i][2]['note'] == 36]
+    assert [kind for kind, _, _ in pedal] == ['note_on']
+    items = list(timeline)
+    timeline.close()
+    assert [(kind, beat) for kind, beat, p in items if p['note'] == 36] == [('note_on', 0.0), ('note_off', 999.5)]
+    # The note off is still at its real end, and the length was filled in
+    assert pedal[0][2]['duration_beats'] == 999.5
+
+
+def test_only_a_window_is_kept_and_seeking_back_reads_again(tmp_path):
+    messages = []
+    for i in range(3000):
+        messages.append(mido.Message('note_on', note=60 + i % 12, velocity=90, time=0 if i == 0 else 240))
+        messages.append(mido.Message('note_off', note=60 + i % 12, time=240))
+    timeline = MidiFileTimeline(write_file(tmp_path / 'window.mid', [messages]), keep=100)
+    items = list(timeline)
+    assert len(items) == len(timeline) == 6000
+    assert len(timeline.items) <= 200 and timeline.offset > 0
+
+    transport = Transport(timeline, TempoMap(120))
+    transport.seek(2999)
+    played = []
+    for kind, beat, payload, seconds in transport.events():
+        played.append((kind, beat))
+        if len(played) == 3:
+            # Back before everything still kept
+            transport.seek(1)
+        if len(played) == 6:
+            break
+    assert timeline.offset == 0
+    timeline.close()
+    assert played == [('all_off', 0.0), ('note_on', 2999.0), ('note_off', 2999.5),
+                      ('all_off', 2999.5), ('note_on', 1.0), ('note_off', 1.5)]
+
+
+def test_truncated_file_raises_value_error(tmp_path):
+    messages = []
+    for i in range(10):
+        messages.append(mido.Message('note_on', note=60, velocity=90, time=0))
+        messages.append(mido.Message('note_off', note=60, time=240))
+    data = open(write_file(tmp_path / 'full.mid', [messages]), 'rb').read()
+    for size in (10, 24, len(data) - 6):
+        path = tmp_path / 'cut{}.mid'.format(size)
+        path.write_bytes(data[:size])
+        with pytest.raises(ValueError):
+            list(MidiFileTimeline(str(path)))
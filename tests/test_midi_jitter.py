@@ -0,0 +1,46 @@
+import csv
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from midi_jitter import P99_WINDOW, JitterLog
+
+
+def test_stats_use_absolute_error():
+    log = JitterLog()
+    for i in range(100):
+        log.record('note_on', i, i * 0.1, i * 0.1 + 0.001)
+    log.record('note_off', 100, 10.0, 10.02)
+    log.record('note_on', 101, 10.1, 10.095)
+    stats = log.stats()
+    assert stats['count'] == 102
+    assert round(stats['max_ms'], 6) == 20.0
+    assert round(stats['p99_ms'], 6) == 5.0
+    assert round(stats['mean_ms'], 6) == round((100 * 1.0 + 20.0 + 5.0) / 102, 6)
+    assert JitterLog().stats()['count'] == 0
+
+
+def test_csv_export(tmp_path):
+    log = JitterLog()
+    log.record('note_on', 0.0, 0.0, 0.002)
+    log.record('vocal', 1.0, 0.5, 0.5)
+    path = str(tmp_path / 'timing.csv')
+    assert log.to_csv(path) == 2
+    with open(path) as f:
+        rows = list(csv.DictReader(f))
+    assert rows[0]['kind'] == 'note_on'
+    assert float(rows[0]['error_ms']) == 2.0
+    assert float(rows[1]['error_ms']) == 0.0
+
+
+def test_p99_follows_recent_events_and_the_rest_cover_all():
+    log = JitterLog()
+    log.record('note_on', 0, 0.0, 0.5)
+    for i in range(1, P99_WINDOW + 1):
+        log.record('note_on', i, i, i + 0.001)
+    stats = log.stats()
+    assert stats['count'] == P99_WINDOW + 1
+    # The early 500 ms outlier has left the window but still counts for max
+    assert round(stats['p99_ms'], 6) == 1.0
+    assert round(stats['max_ms'], 6) == 500.0
+    assert len(log) == P99_WINDOW + 1
@@ -0,0 +1,103 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from midi_mixer import StreamMixer, PcmRing, Performer, FADE_SAMPLES
+
+
+def test_voice_starts_on_its_exact_sample():
+    mixer = StreamMixer(block_size=64)
+    mixer.play(np.full(10, 1000, dtype=np.int16), at_sample=100)
+    out = np.concatenate([mixer.render() for _ in range(3)])
+    assert (out[:100] == 0).all()
+    assert (out[100:110] == 1000).all()
+    assert (out[110:] == 0).all()
+
+
+def test_stop_fades_out_and_polyphony_steals_oldest():
+    mixer = StreamMixer(block_size=256, polyphony=2)
+    tone = np.full(4096, 100, dtype=np.int16)
+    first = mixer.play(tone, 0)
+    mixer.play(tone, 0)
+    mixer.play(tone, 10)
+    mixer.render()
+    assert first.stolen and mixer.stolen_count == 1
+    assert mixer.active_voices() == 2
+
+    voice = mixer.play(tone, 300)
+    mixer.stop(voice, 400)
+    out = np.concatenate([mixer.render() for _ in range(4)])
+    assert voice not in mixer.active
+    # out starts at sample 256. The new voice steals the second one, then
+    # is stopped itself, leaving only the third.
+    assert out[299 - 256] == 200
+    assert out[350 - 256] == 260
+    assert out[400 + FADE_SAMPLES - 256] == 100
+
+
+def test_ring_buffer_wraps():
+    ring = PcmRing(8)
+    ring.write(np.arange(6, dtype=np.int16))
+    assert list(ring.read(4)) == [0, 1, 2, 3]
+    ring.write(np.arange(6, 12, dtype=np.int16))
+    assert len(ring) == 8 and ring.space() == 0
+    assert list(ring.read(8)) == list(range(4, 12))
+
+
+class RecordingSynth:
+    def __init__(self):
+        self.lengths = []
+
+    def note(self, note, duration_seconds, volume=0.6, timbre='lead'):
+        self.lengths.append(duration_seconds)
+        return np.zeros(8, dtype=np.int16)
+
+    def vocal(self, syllable, duration_seconds, volume=0.7):
+        return np.zeros(8, dtype=np.int16)
+
+    def perc(self, kind='hat'):
+        return np.zeros(8, dtype=np.int16)
+
+
+def test_note_length_follows_the_current_tempo():
+    synth = RecordingSynth()
+    performer = Performer(StreamMixer(), synth)
+    event = {'note': 60, 'start_beat': 0, 'duration_beats': 2}
+    performer.handle('note_on', event, 0, 0.5)     # 120 BPM
+    performer.handle('note_on', event, 0, 0.25)    # 240 BPM
+    assert [round(x, 6) for x in synth.lengths] == [1.0, 0.5]
+
+
+def test_overlapping_notes_on_one_pitch_stop_their_own_voice():
+    mixer = StreamMixer()
+    performer = Performer(mixer, RecordingSynth())
+    long_note = {'note': 60, 'start_beat': 0, 'duration_beats': 4}
+    short_note = {'note': 60, 'start_beat': 1, 'duration_beats': 1}
+    performer.handle('note_on', long_note, 0, 0.5)
+    performer.handle('note_on', short_note, 100, 0.5)
+    first, second = sorted(mixer.pending)
+    performer.handle('note_off', short_note, 200, 0.5)
+    # only the short note is released, the long one keeps ringing
+    assert first.end is None
+    assert second.end is not None
+    assert len(performer.voices) == 1
+    performer.handle('note_off', long_note, 400, 0.5)
+    assert first.end is not None
+    assert len(performer.voices) == 0
+
+
+def test_prewarmed_notes_are_not_synthesized_again():
+    synth = RecordingSynth()
+    prewarmed = {(60, 1.0, 'lead'): np.full(100, 7, dtype=np.int16)}
+    mixer = StreamMixer()
+    performer = Performer(mixer, synth, prewarmed)
+    performer.handle('note_on', {'note': 60, 'start_beat': 0, 'duration_beats': 2}, 0, 0.5)
+    assert synth.lengths == []
+    assert mixer.render(10)[5] != 0
+    # Anything else is made once, then kept
+    event = {'note': 62, 'start_beat': 0, 'duration_beats': 2}
+    performer.handle('note_on', event, 0, 0.5)
+    performer.handle('note_on', event, 0, 0.5)
+    assert len(synth.lengths) == 1
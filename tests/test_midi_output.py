@@ -0,0 +1,85 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from midi_jitter import JitterLog
+from midi_output import NOTE_OFF, NOTE_ON, MidiScheduler
+from midi_timeline import TempoMap, Transport, build_timeline
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = 0
+
+    def time(self):
+        return int(self.now)
+
+    def sleep(self, seconds):
+        self.sleeps += 1
+        self.now += seconds * 1000
+
+
+class FakeOutput:
+    def __init__(self, clock):
+        self.clock = clock
+        self.writes = []
+
+    def write(self, data):
+        self.writes.append((self.clock.time(), data))
+
+
+def run(events, bpm=120):
+    clock = FakeClock()
+    out = FakeOutput(clock)
+    transport = Transport(build_timeline(events), TempoMap(bpm))
+    scheduler = MidiScheduler(out, transport, clock.time, clock.sleep)
+    scheduler.run()
+    return scheduler, out, clock
+
+
+def test_messages_are_timestamped_and_sent_ahead():
+    events = [{'note': 60, 'start_beat': b * 0.25, 'duration_beats': 0.25} for b in range(64)]
+    scheduler, out, clock = run(events)
+    messages = [m for _, batch in out.writes for m in batch]
+    ons = [stamp for (status, _, _), stamp in messages if status == NOTE_ON]
+    assert len(ons) == 64
+    # 120 BPM sixteenths are 125 ms apart, counted from a 50 ms start delay
+    assert ons == [1050 + 125 * i for i in range(64)]
+    for sent_at, batch in out.writes:
+        assert all(stamp >= sent_at for _, stamp in batch)
+    # one write per batch_ms of music, not one per event
+    assert len(out.writes) <= 64 * 125 // scheduler.batch_ms
+    assert scheduler.wakeups < len(out.writes)
+
+
+def test_overlapping_pitch_is_released_by_the_last_event():
+    events = [
+        {'note': 60, 'start_beat': 0, 'duration_beats': 2},
+        {'note': 60, 'start_beat': 1, 'duration_beats': 0.5},
+    ]
+    scheduler, out, clock = run(events, bpm=60)
+    messages = [(status, note, stamp) for _, batch in out.writes for (status, note, _), stamp in batch
+                if status in (NOTE_ON, NOTE_OFF)]
+    assert messages == [(NOTE_ON, 60, 1050), (NOTE_ON, 60, 2050), (NOTE_OFF, 60, 3050)]
+
+
+def test_jitter_counts_messages_handed_over_late():
+    clock = FakeClock()
+    out = FakeOutput(clock)
+    events = [{'note': 60, 'start_beat': b, 'duration_beats': 0.5} for b in range(8)]
+    transport = Transport(build_timeline(events), TempoMap(120))
+    log = JitterLog()
+    # A clock that jumps 80 ms on every sleep, like a badly overloaded thread
+    scheduler = MidiScheduler(out, transport, clock.time, lambda s: clock.sleep(s + 0.08), jitter=log)
+    scheduler.run()
+    assert len(log) == 16
+    assert log.underruns == 0
+    assert log.stats()['max_ms'] == 0.0
+
+    log = JitterLog()
+    scheduler = MidiScheduler(out, Transport(build_timeline(events), TempoMap(120)), clock.time,
+                              lambda s: clock.sleep(s + 0.6), jitter=log)
+    scheduler.run()
+    assert log.underruns > 0
+    assert log.stats()['max_ms'] > 0
@@ -0,0 +1,100 @@
+import cmath
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from midi_synth import Wavetable, envelope, note_samples, perc_samples, to_int16, vocal_samples, vowel_formants
+
+
+def reference_note(note, duration_seconds, volume=0.6, timbre='lead', sample_rate=44100):
+    # the original per-sample loop from MidiPlayerThread
+    freq = 440.0 * (2 ** ((note - 69) / 12.0))
+    length = int(sample_rate * max(0.05, duration_seconds))
+    attack = int(0.01 * sample_rate)
+    release = int(0.02 * sample_rate)
+    out = []
+    for i in range(length):
+        t = i / sample_rate
+        if timbre == 'bass':
+            sample = float(cmath.sin(2.0 * cmath.pi * freq * t).real)
+        else:
+            s1 = float(cmath.sin(2.0 * cmath.pi * freq * t).real)
+            s2 = 0.5 * float(cmath.sin(2.0 * cmath.pi * (freq * 2) * t).real)
+            s3 = 0.25 * float(cmath.sin(2.0 * cmath.pi * (freq * 3) * t).real)
+            sample = (s1 + s2 + s3)
+        if i < attack and attack > 0:
+            env = (i / attack)
+        elif i > length - release and release > 0:
+            env = ((length - i) / release)
+        else:
+            env = 0.85
+        val = int((sample / (1.0 + 0.5 + 0.25)) * env * volume * 32767)
+        out.append(max(-32768, min(32767, val)))
+    return np.array(out, dtype=np.int16)
+
+
+def test_note_matches_original_loop():
+    for timbre, note in (('lead', 72), ('bass', 40)):
+        fast = note_samples(note, 0.1, timbre=timbre)
+        slow = reference_note(note, 0.1, timbre=timbre)
+        assert fast.dtype == np.int16 and len(fast) == len(slow)
+        # sin() from numpy and cmath may differ in the last bit
+        assert np.abs(fast.astype(int) - slow.astype(int)).max() <= 1
+
+
+def test_vocal_and_perc_shapes():
+    vocal = vocal_samples('sto', 0.2)
+    assert len(vocal) == int(44100 * 0.2)
+    assert vocal[0] == 0 and np.abs(vocal).max() <= 3276
+    hat = perc_samples('hat', rng=np.random.default_rng(0))
+    assert len(hat) == int(44100 * 0.08)
+    # the noise burst decays to silence
+    assert np.abs(hat[-100:]).max() < np.abs(hat[:100]).max()
+
+
+def test_vocal_wavetable_matches_formant_sum():
+    for syllable in ('sto', 'tu'):
+        fast = vocal_samples(syllable, 0.1)
+        t = np.arange(len(fast)) / 44100.0
+        s = sum(np.sin(2.0 * np.pi * f * t) * 0.3 for f in vowel_formants(syllable))
+        slow = to_int16(s * envelope(len(fast), 0.9) * 0.7 * 3276)
+        assert np.abs(fast.astype(int) - slow.astype(int)).max() <= 1
+
+
+def test_wavetable_drops_partials_above_nyquist():
+    table = Wavetable([(1, 1.0), (2, 0.5), (3, 0.25)])
+    low = table.table(440.0)
+    high = table.table(9000.0)     # 3rd partial at 27 kHz would alias
+    assert low is table.table(880.0)
+    spectrum = np.abs(np.fft.rfft(high[:-1]))
+    assert spectrum[3] < 1e-6 and spectrum[2] > 1.0
+    # and a new timbre renders at the requested pitch
+    tone = Wavetable([(1, 1.0)]).render(441.0, 100, 44100)
+    assert np.allclose(tone, np.sin(2.0 * np.pi * 441.0 * np.arange(100) / 44100), atol=1e-5)
+
+
+def test_notes_in_a_process_pool_fill_the_cache():
+    from concurrent.futures import ProcessPoolExecutor
+    from midi_synth import Synth
+
+    class DictCache:
+        def __init__(self):
+            self.entries = {}
+
+        def get(self, key):
+            return self.entries.get(key)
+
+        def put(self, key, samples):
+            self.entries[key] = samples
+
+    synth = Synth(cache=DictCache())
+    wanted = [(60, 0.1, 'lead'), (40, 0.2, 'bass'), (60, 0.1, 'lead')]
+    with ProcessPoolExecutor(1) as pool:
+        made = synth.notes(wanted, pool)
+    assert sorted(made) == [(40, 0.2, 'bass'), (60, 0.1, 'lead')]
+    assert np.array_equal(made[(60, 0.1, 'lead')], note_samples(60, 0.1))
+    assert len(synth.cache.entries) == 2
+    # a second call is answered from the cache
+    assert synth.notes(wanted)[(40, 0.2, 'bass')] is made[(40, 0.2, 'bass')]
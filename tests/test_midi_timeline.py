@@ -0,0 +1,64 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from midi_timeline import TempoMap, Transport, VoiceTable, build_timeline
+
+
+def test_tempo_map_round_trip_and_partial_update():
+    tempo_map = TempoMap(120)
+    tempo_map.set_tempo_from(8, 60)
+    assert tempo_map.seconds_at(8) == 4.0
+    assert tempo_map.seconds_at(10) == 6.0
+    assert tempo_map.beat_at(6.0) == 10.0
+    # a later change leaves everything before it alone
+    tempo_map.set_tempo_from(10, 240)
+    assert tempo_map.seconds_at(9) == 5.0
+    assert tempo_map.seconds_at(14) == 7.0
+
+
+def make_transport(beats=16):
+    events = [{'note': 60, 'start_beat': b, 'duration_beats': 0.5} for b in range(beats)]
+    return Transport(build_timeline(events), TempoMap(60))
+
+
+def test_loop_wraps_with_continuous_time():
+    transport = make_transport()
+    transport.set_loop(2, 4)
+    seen = []
+    for kind, beat, payload, seconds in transport.events():
+        seen.append((kind, beat, seconds))
+        if len(seen) == 12:
+            break
+    ons = [(beat, seconds) for kind, beat, seconds in seen if kind == 'note_on']
+    assert ons[:5] == [(0, 0.0), (1, 1.0), (2, 2.0), (3, 3.0), (2, 4.0)]
+    assert ('all_off', 4, 4.0) in seen
+
+
+def test_seek_jumps_without_losing_time():
+    transport = make_transport(1000)
+    events = transport.events()
+    next(events)
+    next(events)  # note_off at 0.5 s
+    transport.seek(900)
+    kind, beat, payload, seconds = next(events)
+    assert kind == 'all_off' and seconds == 0.5
+    kind, beat, payload, seconds = next(events)
+    assert (kind, beat, seconds) == ('note_on', 900, 0.5)
+    assert transport.position_beat == 900
+
+
+def test_voice_table_keys_by_event_and_note():
+    table = VoiceTable()
+    chord = {'chord': [60, 64, 67], 'start_beat': 0, 'duration_beats': 1}
+    note = {'note': 64, 'start_beat': 0, 'duration_beats': 1}
+    for n in chord['chord']:
+        assert table.start(chord, n, ('chord', n)) is None
+    table.start(note, 64, 'note')
+    assert table.stop(note, 64) == 'note'
+    assert table.stop(note, 64) is None
+    assert table.stop(chord, 64) == ('chord', 64)
+    # starting a note its event already holds hands back the old voice
+    assert table.start(chord, 60, 'again') == ('chord', 60)
+    assert sorted(map(str, table.clear())) == ["('chord', 67)", 'again']
+    assert len(table) == 0
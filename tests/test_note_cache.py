@@ -0,0 +1,82 @@
+import os
+import sys
+import threading
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from note_cache import NoteCache, cache_key
+
+
+def test_entries_survive_a_restart(tmp_path):
+    key = cache_key(60, 0.5, 'lead', 0.6, 44100)
+    samples = np.arange(-500, 500, dtype=np.int16)
+    NoteCache(str(tmp_path)).put(key, samples)
+
+    cache = NoteCache(str(tmp_path))
+    made = []
+    loaded = cache.get_or_make(key, lambda: made.append(1))
+    assert not made
+    assert np.array_equal(loaded, samples)
+    assert cache.hits == 1
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    block = np.zeros(100, dtype=np.int16)  # 200 bytes per entry
+    cache = NoteCache(str(tmp_path), max_bytes=450)
+    first = cache_key(60, 1, 'lead', 0.6, 44100)
+    second = cache_key(62, 1, 'lead', 0.6, 44100)
+    third = cache_key(64, 1, 'lead', 0.6, 44100)
+    cache.put(first, block)
+    cache.put(second, block)
+    cache.get(first)
+    cache.put(third, block)
+    assert cache.get(second) is None
+    assert cache.get(first) is not None and cache.get(third) is not None
+    assert len(os.listdir(str(tmp_path))) == 2
+
+
+def test_rescan_picks_up_another_process_s_changes(tmp_path):
+    block = np.zeros(100, dtype=np.int16)
+    cache = NoteCache(str(tmp_path), max_bytes=450)
+    cache.put(cache_key(60, 1, 'lead', 0.6, 44100), block)
+    # Another NoteCache on the same directory, as in a pool worker
+    other = NoteCache(str(tmp_path), max_bytes=450)
+    other.put(cache_key(62, 1, 'lead', 0.6, 44100), block)
+    other.put(cache_key(64, 1, 'lead', 0.6, 44100), block)
+    assert cache.total_bytes == 200
+    cache.rescan()
+    assert cache.total_bytes == 400 and len(cache.entries) == 2
+    assert cache.get(cache_key(64, 1, 'lead', 0.6, 44100)) is not None
+
+
+def test_corrupt_entry_is_a_miss_and_removed(tmp_path):
+    key = cache_key(60, 0.5, 'lead', 0.6, 44100)
+    cache = NoteCache(str(tmp_path))
+    cache.put(key, np.arange(10, dtype=np.int16))
+    path = os.path.join(str(tmp_path), cache._file_name(key))
+    # An odd number of bytes cannot be int16 samples
+    with open(path, 'wb') as f:
+        f.write(b'abc')
+    assert cache.get(key) is None
+    assert not os.path.exists(path)
+    assert cache.get_or_make(key, lambda: np.ones(4, dtype=np.int16)).tolist() == [1, 1, 1, 1]
+
+
+def test_concurrent_writers_never_install_a_torn_entry(tmp_path):
+    key = cache_key(60, 0.5, 'lead', 0.6, 44100)
+    caches = [NoteCache(str(tmp_path)) for _ in range(4)]
+    blocks = [np.full(50000, i, dtype=np.int16) for i in range(4)]
+
+    def write(i):
+        for _ in range(20):
+            caches[i].put(key, blocks[i])
+
+    threads = [threading.Thread(target=write, args=(i,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    samples = NoteCache(str(tmp_path)).get(key)
+    assert len(samples) == 50000 and len(set(samples[::1000].tolist())) == 1
+    assert [n for n in os.listdir(str(tmp_path)) if n.endswith('.tmp')] == []
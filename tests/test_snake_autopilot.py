@@ -0,0 +1,42 @@
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from snake_autopilot import Autopilot
+from snake_board import FreeCells, SnakeBody, STEPS
+
+
+def test_autopilot_eats_without_crashing():
+    rng = random.Random(2)
+    free = FreeCells(10, 10)
+    snake = SnakeBody((5, 5), free)
+    pilot = Autopilot(10, 10)
+    food = free.choice(rng)
+    eaten = 0
+    for _ in range(2000):
+        direction = pilot.next_direction(snake, food)
+        assert direction is not None
+        dx, dy = STEPS[direction]
+        cell = (snake.head[0] + dx, snake.head[1] + dy)
+        assert 0 <= cell[0] < 10 and 0 <= cell[1] < 10
+        assert not snake.hits_itself(cell)
+        snake.move(cell)
+        if cell == food:
+            eaten += 1
+            snake.grow()
+            food = free.choice(rng)
+            if food is None:
+                break
+    assert eaten >= 20
+
+
+def test_path_is_reused_until_the_food_moves():
+    snake = SnakeBody((0, 0))
+    pilot = Autopilot(20, 20)
+    food = (15, 12)
+    for _ in range(27):
+        dx, dy = STEPS[pilot.next_direction(snake, food)]
+        snake.move((snake.head[0] + dx, snake.head[1] + dy))
+    assert snake.head == food
+    assert pilot.plans == 1
@@ -0,0 +1,62 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import random
+
+from snake_board import FreeCells, SnakeBody
+
+
+def make_snake(length):
+    # snake lying along the x axis, head at (length - 1, 0)
+    snake = SnakeBody((0, 0))
+    snake.grow(length - 1)
+    for x in range(1, length):
+        snake.move((x, 0))
+    return snake
+
+
+def test_move_adds_head_and_drops_tail():
+    snake = make_snake(3)
+    assert list(snake.cells) == [(2, 0), (1, 0), (0, 0)]
+    dropped = snake.move((3, 0))
+    assert dropped == (0, 0)
+    assert (0, 0) not in snake
+    assert snake.head == (3, 0) and len(snake) == 3
+
+
+def test_self_collision_allows_the_moving_tail():
+    snake = make_snake(4)
+    # bend into a square: the head comes back next to the tail
+    snake.move((3, 1))
+    snake.move((2, 1))
+    assert snake.tail == (2, 0)
+    assert snake.hits_itself((3, 1))
+    assert not snake.hits_itself((2, 0))
+    snake.grow()
+    assert snake.hits_itself((2, 0))
+
+
+def test_free_cells_follow_the_body():
+    free = FreeCells(4, 3)
+    snake = SnakeBody((0, 0), free)
+    snake.grow(2)
+    snake.move((1, 0))
+    snake.move((2, 0))
+    snake.move((3, 0))
+    assert len(free) == 12 - 3
+    assert (0, 0) in free and (1, 0) not in free
+    occupied = set(snake.cells)
+    rng = random.Random(5)
+    for _ in range(50):
+        assert free.choice(rng) not in occupied
+
+
+def test_free_cells_full_board():
+    free = FreeCells(2, 1)
+    free.take((0, 0))
+    assert free.choice() == (1, 0)
+    free.take((1, 0))
+    assert free.choice() is None
+    free.give((0, 0))
+    assert free.choice() == (0, 0)
@@ -0,0 +1,36 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from snake_env import VecSnakeEnv, BODY, HEAD, FOOD
+
+
+def test_board_stays_consistent_under_random_play():
+    env = VecSnakeEnv(64, 8, 8, seed=3)
+    env.reset()
+    rng = np.random.default_rng(0)
+    for _ in range(300):
+        obs, reward, done, info = env.step(rng.integers(0, 4, size=64))
+        flat = obs.reshape(64, -1)
+        assert ((flat == HEAD).sum(axis=1) == 1).all()
+        assert ((flat == FOOD).sum(axis=1) == 1).all()
+        assert ((flat == BODY).sum(axis=1) + 1 == env.length).all()
+
+
+def test_eating_grows_and_wall_ends_the_game():
+    env = VecSnakeEnv(1, 5, 5, seed=0)
+    env.reset()
+    # put the food right in front of the head (centre cell 12, moving right)
+    env.flat[0, env.food[0]] = 0
+    env.food[0] = 13
+    env.flat[0, 13] = FOOD
+    obs, reward, done, info = env.step([1])
+    assert reward[0] == 1.0 and info['length'][0] == 2
+    obs, reward, done, info = env.step([1])
+    assert not done[0]
+    obs, reward, done, info = env.step([1])
+    assert done[0] and reward[0] == -1.0
+    # finished boards come back as a fresh game
+    assert env.length[0] == 1